@@ -1,10 +1,19 @@
 import os
 import sys
+import uuid
+import base64
+import calendar
+import logging
 import psycopg2
+import psycopg2.extras
 import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+from request_profiler import init_profiling
+from tracing import init_tracing, traced, TracingCursor
+from request_logging import init_logging
+from singleflight import coalesce
 
 # Load environment variables from .env file
 load_dotenv('ehr-project/backend/.env')
@@ -17,10 +26,38 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'postgres')
 }
 
+# Clinic hours used when computing provider availability
+CLINIC_OPEN = datetime.time.fromisoformat(os.getenv('CLINIC_OPEN', '08:00'))
+CLINIC_CLOSE = datetime.time.fromisoformat(os.getenv('CLINIC_CLOSE', '17:00'))
+DEFAULT_DURATION_MINUTES = 30
+MAX_AVAILABILITY_DAYS = 31
+MAX_SERIES_OCCURRENCES = 500
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
 app = Flask(__name__)
 CORS(app)
+init_profiling(app, 'appointments_api')
+init_tracing(app, 'appointments_api')
+init_logging(app, 'appointments_api')
+
+logger = logging.getLogger('appointments_api')
 
 
+@traced('serialize.rows')
+def serialize_rows(columns, rows):
+    """Convert result rows to dicts with ISO formatted dates and times."""
+    records = []
+    for row in rows:
+        record = dict(zip(columns, row))
+        for k, v in record.items():
+            if isinstance(v, (datetime.date, datetime.datetime)):
+                record[k] = v.isoformat()
+        records.append(record)
+    return records
+
+
+@traced('db.connect')
 def get_db_connection():
     """Create a database connection."""
     try:
@@ -29,19 +66,166 @@ def get_db_connection():
             port=DB_CONFIG['port'],
             database=DB_CONFIG['database'],
             user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
+            password=DB_CONFIG['password'],
+            cursor_factory=TracingCursor
         )
         return conn
     except Exception as e:
-        print(f"Database connection error: {e}")
+        logger.error(f"Database connection error: {e}")
         return None
 
 
+# Quick filter tabs sent by the appointments views as ``?filter=``
+FILTER_STATUSES = {
+    'completed': 'Completed',
+    'cancelled': 'Cancelled',
+}
+
+
+def parse_local_datetime(value):
+    """Parse an ISO timestamp as naive local time, like the stored appointment times.
+
+    Values with a UTC offset are converted to local time first, so they
+    compare with naive datetimes instead of raising TypeError.
+    """
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def require_string(data, field):
+    """Return ``data[field]``, raising ValueError unless it is a string."""
+    value = data[field]
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be a string")
+    return value
+
+
+def parse_duration(value):
+    """Parse a duration in minutes given as an integer or a numeric string."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError("duration_minutes must be a whole number of minutes")
+    return int(value)
+
+
+def build_appointment_filters(args):
+    """Translate query parameters into WHERE conditions and their parameters.
+
+    Every condition is sargable so that the composite indexes on
+    ``(provider_id, appointment_time)``, ``(patient_id, appointment_time)``
+    and ``(status, appointment_time)`` can serve the lookup.
+    """
+    conditions = []
+    params = []
+
+    start = args.get('from')
+    end = args.get('to')
+    if start:
+        start = parse_local_datetime(start)
+    if end:
+        end = parse_local_datetime(end)
+        # A bare date means "through the end of that day"
+        if len(args.get('to')) == 10:
+            end += datetime.timedelta(days=1)
+
+    quick_filter = args.get('filter', '').lower()
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+    if quick_filter == 'today':
+        start = max(start, today) if start else today
+        tomorrow = today + datetime.timedelta(days=1)
+        end = min(end, tomorrow) if end else tomorrow
+    elif quick_filter == 'upcoming':
+        now = datetime.datetime.now()
+        start = max(start, now) if start else now
+        conditions.append("a.status = %s")
+        params.append('Scheduled')
+    elif quick_filter in FILTER_STATUSES:
+        conditions.append("a.status = %s")
+        params.append(FILTER_STATUSES[quick_filter])
+
+    if start:
+        conditions.append("a.appointment_time >= %s")
+        params.append(start)
+    if end:
+        conditions.append("a.appointment_time < %s")
+        params.append(end)
+
+    status = args.get('status')
+    if status:
+        statuses = [s.strip() for s in status.split(',') if s.strip()]
+        conditions.append("a.status = ANY(%s)")
+        params.append(statuses)
+
+    for key in ('provider_id', 'patient_id'):
+        value = args.get(key)
+        if value:
+            conditions.append(f"a.{key} = %s")
+            params.append(int(value))
+
+    search = args.get('search', '').strip()
+    if search:
+        pattern = f'%{search}%'
+        conditions.append(
+            "(a.reason ILIKE %s OR p.first_name ILIKE %s OR p.last_name ILIKE %s)"
+        )
+        params.extend([pattern, pattern, pattern])
+
+    return conditions, params
+
+
+def encode_cursor(appointment_time, appt_id):
+    """Encode an ``(appointment_time, id)`` position as an opaque cursor."""
+    raw = f"{appointment_time.isoformat()}|{appt_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by ``encode_cursor``."""
+    try:
+        timestamp, appt_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(timestamp), int(appt_id)
+    except Exception:
+        raise ValueError(f"malformed cursor '{cursor}'")
+
+
 @app.route('/api/appointments', methods=['GET'])
 def get_appointments():
-    """Return a list of appointments."""
-    limit = int(request.args.get('limit', 50))
-    offset = int(request.args.get('offset', 0))
+    """Return a list of appointments, newest first.
+
+    Supports ``from``/``to`` (ISO date or datetime), ``status`` (comma
+    separated), ``provider_id``, ``patient_id``, ``search`` (reason or
+    patient name) and the ``filter`` quick tabs used by the UI.
+
+    Pages are addressed with the ``before`` cursor (older page) or the
+    ``after`` cursor (newer page) returned as ``next_cursor`` and
+    ``prev_cursor``.  These seek on ``(appointment_time, id)`` so every
+    page costs the same regardless of depth; ``offset`` is still honoured
+    when no cursor is given.
+    """
+    before = request.args.get('before')
+    after = request.args.get('after')
+    try:
+        limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+        conditions, params = build_appointment_filters(request.args)
+        if before and after:
+            raise ValueError("use either 'before' or 'after', not both")
+        if before:
+            conditions.append("(a.appointment_time, a.id) < (%s, %s)")
+            params.extend(decode_cursor(before))
+        elif after:
+            conditions.append("(a.appointment_time, a.id) > (%s, %s)")
+            params.extend(decode_cursor(after))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid filter: {e}'}), 400
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Walking towards newer rows scans the index forwards; the page is
+    # flipped back to newest-first below
+    direction = 'ASC' if after else 'DESC'
+    if before or after:
+        offset = 0
 
     conn = get_db_connection()
     if not conn:
@@ -50,30 +234,43 @@ def get_appointments():
     cur = conn.cursor()
     try:
         cur.execute(
-            """
-            SELECT a.id, a.appointment_time, a.reason, a.status,
+            f"""
+            SELECT a.id, a.appointment_time, a.reason, a.status, a.duration_minutes,
                    COALESCE(p.last_name || ', ' || p.first_name, '') AS patient,
                    COALESCE(u.full_name, u.username) AS provider
             FROM appointments a
-            LEFT JOIN patients p ON a.patient_id = p.id
+            LEFT JOIN patients p ON a.patient_id = p.patient_id
             LEFT JOIN users u ON a.provider_id = u.id
-            ORDER BY a.appointment_time DESC
+            {where}
+            ORDER BY a.appointment_time {direction}, a.id {direction}
             LIMIT %s OFFSET %s
             """,
-            (limit, offset)
+            params + [limit + 1, offset]
         )
         rows = cur.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or after:
+                next_cursor = encode_cursor(last[1], last[0])
+            if before or offset or (after and has_more):
+                prev_cursor = encode_cursor(first[1], first[0])
+
         columns = [desc[0] for desc in cur.description]
-        appointments = []
-        for row in rows:
-            record = dict(zip(columns, row))
-            for k, v in record.items():
-                if isinstance(v, (datetime.date, datetime.datetime)):
-                    record[k] = v.isoformat()
-            appointments.append(record)
-        return jsonify({'success': True, 'appointments': appointments})
+        appointments = serialize_rows(columns, rows)
+        return jsonify({
+            'success': True,
+            'appointments': appointments,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        })
     except Exception as e:
-        print(f"Error fetching appointments: {e}")
+        logger.exception("Error fetching appointments")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cur.close()
@@ -91,11 +288,11 @@ def get_appointment(appt_id):
         cur.execute(
             """
             SELECT a.id, a.appointment_time, a.reason, a.status,
-                   a.patient_id, a.provider_id,
+                   a.duration_minutes, a.patient_id, a.provider_id,
                    COALESCE(p.last_name || ', ' || p.first_name, '') AS patient,
                    COALESCE(u.full_name, u.username) AS provider
             FROM appointments a
-            LEFT JOIN patients p ON a.patient_id = p.id
+            LEFT JOIN patients p ON a.patient_id = p.patient_id
             LEFT JOIN users u ON a.provider_id = u.id
             WHERE a.id = %s
             """,
@@ -111,7 +308,7 @@ def get_appointment(appt_id):
                 appt[k] = v.isoformat()
         return jsonify({'success': True, 'appointment': appt})
     except Exception as e:
-        print(f"Error fetching appointment: {e}")
+        logger.exception("Error fetching appointment")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cur.close()
@@ -132,14 +329,16 @@ def create_appointment():
     try:
         cur.execute(
             """
-            INSERT INTO appointments (patient_id, provider_id, appointment_time, reason, status, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
+            INSERT INTO appointments (patient_id, provider_id, appointment_time, duration_minutes,
+                                      reason, status, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW(), NOW())
             RETURNING id
             """,
             (
                 data.get('patient_id'),
                 data.get('provider_id'),
                 data.get('appointment_time'),
+                data.get('duration_minutes', DEFAULT_DURATION_MINUTES),
                 data.get('reason'),
                 data.get('status', 'Scheduled')
             )
@@ -147,9 +346,230 @@ def create_appointment():
         new_id = cur.fetchone()[0]
         conn.commit()
         return jsonify({'success': True, 'appointment_id': new_id})
+    except psycopg2.errors.ExclusionViolation:
+        conn.rollback()
+        return jsonify({'success': False, 'message': 'Provider already has an appointment at that time'}), 409
+    except Exception as e:
+        conn.rollback()
+        logger.exception("Error creating appointment")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+def parse_rrule(rule):
+    """Parse an RRULE-style string such as ``FREQ=WEEKLY;COUNT=8;BYDAY=MO,TH``.
+
+    Supports ``FREQ`` (DAILY, WEEKLY, MONTHLY), ``INTERVAL``, ``COUNT``,
+    ``UNTIL`` (ISO date or datetime) and ``BYDAY`` for weekly rules.
+    """
+    parts = {}
+    for part in rule.upper().replace('RRULE:', '').split(';'):
+        if part:
+            key, _, value = part.partition('=')
+            parts[key.strip()] = value.strip()
+
+    freq = parts.get('FREQ')
+    if freq not in ('DAILY', 'WEEKLY', 'MONTHLY'):
+        raise ValueError("FREQ must be DAILY, WEEKLY or MONTHLY")
+    interval = int(parts.get('INTERVAL', 1))
+    if interval < 1:
+        raise ValueError("INTERVAL must be positive")
+    count = int(parts['COUNT']) if 'COUNT' in parts else None
+    until = None
+    if 'UNTIL' in parts:
+        until = parse_local_datetime(parts['UNTIL'])
+        # A bare date includes occurrences on that day
+        if len(parts['UNTIL']) == 10:
+            until += datetime.timedelta(days=1, microseconds=-1)
+    if count is None and until is None:
+        raise ValueError("COUNT or UNTIL is required")
+    byday = None
+    if 'BYDAY' in parts:
+        try:
+            byday = sorted(WEEKDAYS[d] for d in parts['BYDAY'].split(','))
+        except KeyError as e:
+            raise ValueError(f"unknown BYDAY value {e}")
+    return freq, interval, count, until, byday
+
+
+def add_months(moment, months):
+    """Shift a datetime by whole months, clamping to the month's last day."""
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def expand_rrule(start, rule):
+    """Expand a recurrence rule into a list of occurrence datetimes."""
+    freq, interval, count, until, byday = parse_rrule(rule)
+    limit = min(count or MAX_SERIES_OCCURRENCES + 1, MAX_SERIES_OCCURRENCES + 1)
+
+    occurrences = []
+    period = 0
+    while len(occurrences) < limit:
+        if freq == 'DAILY':
+            candidates = [start + datetime.timedelta(days=period * interval)]
+        elif freq == 'MONTHLY':
+            candidates = [add_months(start, period * interval)]
+        else:
+            week_start = start - datetime.timedelta(days=start.weekday()) + datetime.timedelta(weeks=period * interval)
+            days = byday if byday is not None else [start.weekday()]
+            candidates = [week_start + datetime.timedelta(days=d) for d in days]
+        for moment in candidates:
+            if moment < start:
+                continue
+            if until and moment > until:
+                return occurrences
+            occurrences.append(moment)
+            if len(occurrences) >= limit:
+                break
+        period += 1
+    return occurrences
+
+
+def find_internal_overlaps(slots):
+    """Return indexes of slots that overlap an earlier slot in the same set."""
+    overlaps = []
+    ordered = sorted(range(len(slots)), key=lambda i: slots[i][0])
+    latest_end = None
+    for i in ordered:
+        slot_start, duration = slots[i]
+        if latest_end and slot_start < latest_end:
+            overlaps.append(i)
+        slot_end = slot_start + datetime.timedelta(minutes=duration)
+        latest_end = max(latest_end, slot_end) if latest_end else slot_end
+    return sorted(overlaps)
+
+
+@app.route('/api/appointments/bulk', methods=['POST'])
+def create_appointments_bulk():
+    """Create a recurring series or a list of appointments in one transaction.
+
+    The body carries the shared ``patient_id``, ``provider_id``, ``reason``,
+    ``status`` and ``duration_minutes`` plus either ``slots`` (a list of
+    ``{"appointment_time", "duration_minutes"}``) or ``appointment_time``
+    with an ``rrule`` such as ``FREQ=WEEKLY;COUNT=10``.  Conflicts for the
+    whole set are checked with one query; the series is rejected with 409
+    unless ``skip_conflicts`` is true, in which case the free occurrences
+    are booked.  Rows are inserted with a single multi-row INSERT.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'message': 'No data provided'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Request body must be a JSON object'}), 400
+
+    default_duration = data.get('duration_minutes', DEFAULT_DURATION_MINUTES)
+    try:
+        if 'slots' in data:
+            if not isinstance(data['slots'], list):
+                raise ValueError("'slots' must be a list")
+            slots = []
+            for index, slot in enumerate(data['slots']):
+                if not isinstance(slot, dict):
+                    raise ValueError(f"slot {index} must be an object with 'appointment_time'")
+                slots.append((
+                    parse_local_datetime(require_string(slot, 'appointment_time')),
+                    parse_duration(slot.get('duration_minutes', default_duration))
+                ))
+        elif 'rrule' in data and 'appointment_time' in data:
+            start = parse_local_datetime(require_string(data, 'appointment_time'))
+            rule = require_string(data, 'rrule')
+            slots = [(moment, parse_duration(default_duration)) for moment in expand_rrule(start, rule)]
+        else:
+            raise ValueError("provide 'slots' or 'appointment_time' with 'rrule'")
+        if not slots:
+            raise ValueError("no occurrences to schedule")
+        if len(slots) > MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"at most {MAX_SERIES_OCCURRENCES} occurrences per request")
+        if any(duration <= 0 for _, duration in slots):
+            raise ValueError("duration_minutes must be positive")
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid series: {e}'}), 400
+
+    provider_id = data.get('provider_id')
+    status = data.get('status', 'Scheduled')
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database connection failed'}), 500
+    cur = conn.cursor()
+    try:
+        conflicts = {}
+        for i in find_internal_overlaps(slots):
+            conflicts[i] = None
+        if provider_id is not None and status != 'Cancelled':
+            cur.execute(
+                """
+                SELECT s.idx - 1, MIN(a.id)
+                FROM unnest(%s::timestamp[], %s::int[]) WITH ORDINALITY AS s(start_time, duration, idx)
+                JOIN appointments a
+                  ON a.provider_id = %s
+                 AND a.status <> 'Cancelled'
+                 AND a.time_range && tsrange(s.start_time, s.start_time + s.duration * INTERVAL '1 minute')
+                GROUP BY s.idx
+                """,
+                ([start for start, _ in slots], [duration for _, duration in slots], provider_id)
+            )
+            for idx, appt_id in cur.fetchall():
+                conflicts[idx] = appt_id
+
+        conflict_list = [
+            {
+                'index': i,
+                'appointment_time': slots[i][0].isoformat(),
+                'conflicts_with': conflicts[i]
+            }
+            for i in sorted(conflicts)
+        ]
+        if conflicts and not data.get('skip_conflicts'):
+            return jsonify({
+                'success': False,
+                'message': 'One or more occurrences conflict with existing appointments',
+                'conflicts': conflict_list
+            }), 409
+
+        series_id = str(uuid.uuid4())
+        rows = [
+            (
+                data.get('patient_id'), provider_id, start, duration,
+                data.get('reason'), status, series_id
+            )
+            for i, (start, duration) in enumerate(slots)
+            if i not in conflicts
+        ]
+        new_ids = []
+        if rows:
+            result = psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO appointments (patient_id, provider_id, appointment_time, duration_minutes,
+                                          reason, status, series_id, created_at, updated_at)
+                VALUES %s
+                RETURNING id
+                """,
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())",
+                page_size=len(rows),
+                fetch=True
+            )
+            new_ids = [row[0] for row in result]
+        conn.commit()
+        return jsonify({
+            'success': True,
+            'series_id': series_id if new_ids else None,
+            'appointment_ids': new_ids,
+            'skipped': conflict_list
+        })
+    except psycopg2.errors.ExclusionViolation:
+        conn.rollback()
+        return jsonify({'success': False, 'message': 'Provider already has an appointment at that time'}), 409
     except Exception as e:
         conn.rollback()
-        print(f"Error creating appointment: {e}")
+        logger.exception("Error creating appointment series")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cur.close()
@@ -174,7 +594,7 @@ def update_appointment(appt_id):
 
         fields = []
         params = []
-        allowed = ['patient_id', 'provider_id', 'appointment_time', 'reason', 'status']
+        allowed = ['patient_id', 'provider_id', 'appointment_time', 'duration_minutes', 'reason', 'status']
         for key in allowed:
             if key in data:
                 fields.append(f"{key} = %s")
@@ -189,9 +609,12 @@ def update_appointment(appt_id):
         cur.fetchone()
         conn.commit()
         return jsonify({'success': True, 'message': 'Appointment updated'})
+    except psycopg2.errors.ExclusionViolation:
+        conn.rollback()
+        return jsonify({'success': False, 'message': 'Provider already has an appointment at that time'}), 409
     except Exception as e:
         conn.rollback()
-        print(f"Error updating appointment: {e}")
+        logger.exception("Error updating appointment")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cur.close()
@@ -214,7 +637,216 @@ def delete_appointment(appt_id):
         return jsonify({'success': True, 'message': 'Appointment deleted'})
     except Exception as e:
         conn.rollback()
-        print(f"Error deleting appointment: {e}")
+        logger.exception("Error deleting appointment")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+@app.route('/api/appointments/stats', methods=['GET'])
+@coalesce
+def get_appointment_stats():
+    """Return per-day appointment counts by status and provider.
+
+    Reads the trigger-maintained ``appointment_daily_counts`` rollup.
+    Query parameters: ``from``/``to`` (ISO dates, default today) and an
+    optional ``provider_id``.
+    """
+    try:
+        today = datetime.date.today()
+        first_day = datetime.date.fromisoformat(request.args['from']) if request.args.get('from') else today
+        last_day = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else first_day
+        provider_id = request.args.get('provider_id')
+        provider_id = int(provider_id) if provider_id else None
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid parameter: {e}'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database connection failed'}), 500
+    cur = conn.cursor()
+    try:
+        query = """
+            SELECT day, provider_id, status, count
+            FROM appointment_daily_counts
+            WHERE day BETWEEN %s AND %s AND count > 0
+        """
+        params = [first_day, last_day]
+        if provider_id is not None:
+            query += " AND provider_id = %s"
+            params.append(provider_id)
+        cur.execute(query + " ORDER BY day, provider_id, status", params)
+
+        days = {}
+        for day, row_provider, status, count in cur.fetchall():
+            entry = days.setdefault(day.isoformat(), {
+                'date': day.isoformat(), 'total': 0, 'by_status': {}, 'by_provider': {}
+            })
+            entry['total'] += count
+            entry['by_status'][status] = entry['by_status'].get(status, 0) + count
+            provider_counts = entry['by_provider'].setdefault(str(row_provider), {})
+            provider_counts[status] = count
+        return jsonify({'success': True, 'days': list(days.values())})
+    except Exception as e:
+        logger.exception("Error fetching appointment stats")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+def free_intervals(busy, start, end):
+    """Return the gaps between ``start`` and ``end`` not covered by ``busy``.
+
+    ``busy`` is a list of ``(start, end)`` pairs sorted by start; overlapping
+    or touching intervals are merged while sweeping.
+    """
+    free = []
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_start >= end:
+            break
+        if busy_start > cursor:
+            free.append((cursor, busy_start))
+        cursor = max(cursor, busy_end)
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+def slot_starts(free, day_start, slot_minutes):
+    """List slot start times, aligned to ``day_start``, that fit in ``free``."""
+    step = datetime.timedelta(minutes=slot_minutes)
+    starts = []
+    for free_start, free_end in free:
+        offset = -(-(free_start - day_start) // step)
+        slot = day_start + offset * step
+        while slot + step <= free_end:
+            starts.append(slot)
+            slot += step
+    return starts
+
+
+def load_busy_intervals(cur, provider_ids, start, end):
+    """Fetch booked intervals per provider overlapping ``[start, end)``.
+
+    Uses the GiST index behind the appointments overlap constraint, so the
+    cost is proportional to the bookings returned, not the table size.
+    """
+    cur.execute(
+        """
+        SELECT provider_id, lower(time_range), upper(time_range)
+        FROM appointments
+        WHERE provider_id = ANY(%s)
+          AND time_range && tsrange(%s, %s)
+          AND status <> 'Cancelled'
+        ORDER BY provider_id, lower(time_range)
+        """,
+        (list(provider_ids), start, end)
+    )
+    busy = {provider_id: [] for provider_id in provider_ids}
+    for provider_id, busy_start, busy_end in cur.fetchall():
+        busy[provider_id].append((busy_start, busy_end))
+    return busy
+
+
+def provider_calendar(busy, first_day, days, slot_minutes=None):
+    """Build the per-day free intervals (and optional slots) for one provider."""
+    calendar = []
+    for i in range(days):
+        day = first_day + datetime.timedelta(days=i)
+        day_start = datetime.datetime.combine(day, CLINIC_OPEN)
+        day_end = datetime.datetime.combine(day, CLINIC_CLOSE)
+        free = free_intervals(busy, day_start, day_end)
+        entry = {
+            'date': day.isoformat(),
+            'free': [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in free]
+        }
+        if slot_minutes:
+            entry['slots'] = [s.isoformat() for s in slot_starts(free, day_start, slot_minutes)]
+        calendar.append(entry)
+    return calendar
+
+
+def parse_availability_window(args):
+    """Read ``date``/``from`` and ``days`` into a first day and day count."""
+    first_day = args.get('date') or args.get('from')
+    first_day = datetime.date.fromisoformat(first_day) if first_day else datetime.date.today()
+    days = int(args.get('days', 1))
+    if not 1 <= days <= MAX_AVAILABILITY_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_AVAILABILITY_DAYS}")
+    return first_day, days
+
+
+@app.route('/api/providers/<int:provider_id>/availability', methods=['GET'])
+def get_provider_availability(provider_id):
+    """Return a provider's free intervals and bookable slots.
+
+    Query parameters: ``date`` (first day, default today), ``days``
+    (default 1) and ``duration`` (slot length in minutes).
+    """
+    try:
+        first_day, days = parse_availability_window(request.args)
+        slot_minutes = int(request.args.get('duration', DEFAULT_DURATION_MINUTES))
+        if slot_minutes <= 0:
+            raise ValueError("duration must be positive")
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid parameter: {e}'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database connection failed'}), 500
+    cur = conn.cursor()
+    try:
+        window_start = datetime.datetime.combine(first_day, datetime.time.min)
+        window_end = window_start + datetime.timedelta(days=days)
+        busy = load_busy_intervals(cur, [provider_id], window_start, window_end)
+        return jsonify({
+            'success': True,
+            'provider_id': provider_id,
+            'availability': provider_calendar(busy[provider_id], first_day, days, slot_minutes)
+        })
+    except Exception as e:
+        logger.exception("Error fetching availability")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cur.close()
+        conn.close()
+
+
+@app.route('/api/providers/availability', methods=['GET'])
+def get_providers_availability():
+    """Return free intervals for many providers over a window in one query.
+
+    Query parameters: ``provider_id`` (comma separated), ``from`` (first
+    day, default today) and ``days`` (default 1, at most a month).
+    """
+    try:
+        first_day, days = parse_availability_window(request.args)
+        provider_ids = [int(p) for p in request.args.get('provider_id', '').split(',') if p.strip()]
+        if not provider_ids:
+            raise ValueError("provider_id is required")
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid parameter: {e}'}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database connection failed'}), 500
+    cur = conn.cursor()
+    try:
+        window_start = datetime.datetime.combine(first_day, datetime.time.min)
+        window_end = window_start + datetime.timedelta(days=days)
+        busy = load_busy_intervals(cur, provider_ids, window_start, window_end)
+        return jsonify({
+            'success': True,
+            'availability': {
+                str(provider_id): provider_calendar(intervals, first_day, days)
+                for provider_id, intervals in busy.items()
+            }
+        })
+    except Exception as e:
+        logger.exception("Error fetching availability")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cur.close()
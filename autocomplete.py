@@ -0,0 +1,199 @@
+import json
+import time
+import select
+import bisect
+import logging
+import threading
+import unicodedata
+from array import array
+
+logger = logging.getLogger('autocomplete')
+
+# Channel the patients_notify_change trigger publishes on
+NOTIFY_CHANNEL = 'patient_changes'
+
+def normalize_name(text):
+    """Lower-case, strip accents and collapse whitespace for prefix matching."""
+    text = text or ''
+    if text.isascii():
+        return ' '.join(text.lower().split())
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.lower().split())
+
+class NameIndex:
+    """Sorted-array prefix index over patient names.
+
+    Every patient has two keys, "last first" and "first last", so a prefix of
+    either name finds them. Keys are kept in one sorted list, and the patient
+    ids sit in a parallel ``array('q')``. Names live in a single
+    id -> "last<US>first" string mapping. There are no per-patient objects, so
+    millions of names stay compact. A lookup is a binary search plus a
+    short scan.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.ids = array('q')
+        self.names = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def pack(first, last):
+        return f"{last or ''}\x1f{first or ''}"
+
+    @staticmethod
+    def keys_for(first, last):
+        first, last = normalize_name(first), normalize_name(last)
+        return {f"{last} {first}".strip(), f"{first} {last}".strip()} - {''}
+
+    def load(self, rows):
+        """Replace the contents with ``(patient_id, first_name, last_name)`` rows."""
+        names = {}
+        entries = []
+        for patient_id, first, last in rows:
+            names[patient_id] = self.pack(first, last)
+            entries.extend((key, patient_id) for key in self.keys_for(first, last))
+        entries.sort()
+        keys = [key for key, _ in entries]
+        ids = array('q', (patient_id for _, patient_id in entries))
+        with self.lock:
+            self.keys, self.ids, self.names = keys, ids, names
+
+    def upsert(self, patient_id, first, last):
+        with self.lock:
+            self._remove(patient_id)
+            self.names[patient_id] = self.pack(first, last)
+            for key in self.keys_for(first, last):
+                position = bisect.bisect_left(self.keys, key)
+                while position < len(self.keys) and self.keys[position] == key and self.ids[position] < patient_id:
+                    position += 1
+                self.keys.insert(position, key)
+                self.ids.insert(position, patient_id)
+
+    def remove(self, patient_id):
+        with self.lock:
+            self._remove(patient_id)
+
+    def _remove(self, patient_id):
+        packed = self.names.pop(patient_id, None)
+        if packed is None:
+            return
+        last, first = packed.split('\x1f', 1)
+        for key in self.keys_for(first, last):
+            position = bisect.bisect_left(self.keys, key)
+            while position < len(self.keys) and self.keys[position] == key:
+                if self.ids[position] == patient_id:
+                    del self.keys[position]
+                    del self.ids[position]
+                    break
+                position += 1
+
+    def suggest(self, prefix, limit=10):
+        """Return up to ``limit`` (patient_id, "Last, First") pairs whose name starts with ``prefix``."""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.keys, prefix)
+            while position < len(self.keys) and len(results) < limit:
+                if not self.keys[position].startswith(prefix):
+                    break
+                patient_id = self.ids[position]
+                if patient_id not in seen:
+                    seen.add(patient_id)
+                    results.append((patient_id, self.names[patient_id].replace('\x1f', ', ', 1)))
+                position += 1
+        return results
+
+    def __len__(self):
+        return len(self.names)
+
+class AutocompleteService:
+    """Builds a NameIndex from the database and keeps it current via LISTEN/NOTIFY.
+
+    ``connect`` returns a new psycopg2 connection (or None). The background
+    thread LISTENs before it loads the snapshot, so no change is lost between
+    the two. After a lost connection it reconnects and rebuilds.
+    """
+
+    def __init__(self, connect, batch_size=10000):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.index = NameIndex()
+        self.ready = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def ensure_started(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='autocomplete-index', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        backoff = 1
+        while True:
+            conn = self.connect()
+            if conn is None:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                self.build(conn)
+                backoff = 1
+                self.listen(conn)
+            except Exception:
+                logger.exception("Autocomplete index connection lost; rebuilding")
+                self.ready.clear()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def build(self, conn):
+        started = time.perf_counter()
+        # A named cursor streams the rows from the server in batches
+        conn.autocommit = False
+        with conn.cursor(name='autocomplete_build') as cur:
+            cur.itersize = self.batch_size
+            cur.execute("SELECT patient_id, first_name, last_name FROM patients")
+            self.index.load(cur)
+        conn.commit()
+        conn.autocommit = True
+        self.ready.set()
+        logger.info(f"Autocomplete index built with {len(self.index)} patients in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def listen(self, conn):
+        while True:
+            if select.select([conn], [], [], 60) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                self.apply(conn.notifies.pop(0).payload)
+
+    def apply(self, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.error(f"Ignoring malformed {NOTIFY_CHANNEL} payload: {payload!r}")
+            return
+        if change.get('op') == 'DELETE':
+            self.index.remove(change['patient_id'])
+        else:
+            self.index.upsert(change['patient_id'], change.get('first_name'), change.get('last_name'))
+
+    def suggest(self, prefix, limit=10):
+        """Suggestions from the index, or None while it is still being built."""
+        if not self.ready.is_set():
+            return None
+        return self.index.suggest(prefix, limit)
@@ -0,0 +1,173 @@
+import sys
+import json
+import argparse
+import platform
+import statistics
+import timeit
+import datetime
+from colorama import init, Fore, Style
+
+import patient_api
+import appointments_api
+import login_api
+
+# Initialize colorama for colored output
+init()
+
+BASELINE_FILE = 'benchmarks_baseline.json'
+
+# Rows per simulated result page, matching the APIs' default page sizes
+PATIENT_PAGE = 10
+APPOINTMENT_PAGE = 50
+
+def print_header(message):
+    """Print a formatted header message."""
+    print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{message.center(70)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
+
+def print_success(message):
+    """Print a success message."""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print an error message."""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+
+def print_info(message):
+    """Print an info message."""
+    print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
+
+def patient_rows(count):
+    """Build rows shaped like the get_patients SELECT."""
+    columns = ['patient_id', 'first_name', 'last_name', 'date_of_birth', 'gender',
+               'contact_number', 'email', 'blood_type', 'rank', 'service',
+               'allergies', 'medical_conditions']
+    rows = [
+        (i, 'John', f'Smith{i}', datetime.date(1980, 1, 1) + datetime.timedelta(days=i),
+         'Male', '555-123-4567', f'john{i}@example.com', 'O+', 'E-5', 'Army',
+         'Penicillin, Latex', 'Hypertension, Asthma')
+        for i in range(count)
+    ]
+    return columns, rows
+
+def appointment_rows(count):
+    """Build rows shaped like the get_appointments SELECT."""
+    columns = ['id', 'appointment_time', 'reason', 'status', 'duration_minutes', 'patient', 'provider']
+    start = datetime.datetime(2024, 1, 1, 8, 0)
+    rows = [
+        (i, start + datetime.timedelta(minutes=30 * i), 'Follow-up visit', 'Scheduled', 30,
+         f'Smith{i}, John', 'Dr. Jane Doe')
+        for i in range(count)
+    ]
+    return columns, rows
+
+PATIENT_PAYLOAD = {field: f'value-{field}' for field in patient_api.PATIENT_FIELDS}
+
+def build_benchmarks():
+    """Return name -> (callable, operations per call) for every hot path."""
+    patient_columns, patients = patient_rows(PATIENT_PAGE)
+    appointment_columns, appointments = appointment_rows(APPOINTMENT_PAGE)
+    now = datetime.datetime(2024, 1, 1)
+    legacy_hash = login_api.hash_password('adminpass123')
+    bcrypt_hash = login_api.secure_hash_password('adminpass123')
+    token = login_api.create_token('admin')
+
+    return {
+        'serialize_patient_row': (
+            lambda: patient_api.serialize_patient_rows(patient_columns, patients), PATIENT_PAGE),
+        'serialize_appointment_row': (
+            lambda: appointments_api.serialize_rows(appointment_columns, appointments), APPOINTMENT_PAGE),
+        'build_patient_insert': (
+            lambda: patient_api.build_patient_insert(PATIENT_PAYLOAD, now), 1),
+        'build_patient_update': (
+            lambda: patient_api.build_patient_update(1, PATIENT_PAYLOAD, now), 1),
+        'verify_password_sha256': (
+            lambda: login_api.verify_password('adminpass123', legacy_hash), 1),
+        'verify_password_bcrypt': (
+            lambda: login_api.verify_password('adminpass123', bcrypt_hash), 1),
+        'create_token': (
+            lambda: login_api.create_token('admin'), 1),
+        'decode_token': (
+            lambda: login_api.decode_token(token), 1)
+    }
+
+def measure(func, ops, repeat=7):
+    """Time ``func`` and return per-operation timings in microseconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = timer.repeat(repeat=repeat, number=number)
+    per_op = [run / number / ops * 1e6 for run in runs]
+    return {
+        'median_us': round(statistics.median(per_op), 3),
+        'min_us': round(min(per_op), 3),
+        'loops': number
+    }
+
+def run_benchmarks(name_filter=None, repeat=7):
+    """Run every benchmark whose name contains ``name_filter``."""
+    results = {}
+    for name, (func, ops) in build_benchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(func, ops, repeat)
+    return results
+
+def compare(results, baseline, threshold):
+    """Print results against the baseline and return the names that regressed."""
+    regressions = []
+    print(f"{'benchmark':<30}{'best us/op':>14}{'baseline':>12}{'change':>10}")
+    for name, stats in results.items():
+        previous = baseline.get('results', {}).get(name)
+        # The best run is the least disturbed by scheduler and GC noise
+        line = f"{name:<30}{stats['min_us']:>14.3f}"
+        if previous:
+            change = (stats['min_us'] - previous['min_us']) / previous['min_us']
+            color = Fore.RED if change > threshold else Fore.GREEN if change < -threshold else ''
+            line += f"{previous['min_us']:>12.3f}{color}{change:>+10.1%}{Style.RESET_ALL}"
+            if change > threshold:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def main():
+    """Run the micro-benchmarks and compare them with the checked-in baseline."""
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for the API hot paths (no database needed)')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=7, help='Timing repetitions per benchmark')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Fail when the best time is this fraction slower than the baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline results file')
+    parser.add_argument('--save', action='store_true', help='Overwrite the baseline with this run')
+    args = parser.parse_args()
+
+    print_header("EHR Micro-benchmarks")
+    results = run_benchmarks(args.filter, args.repeat)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'recorded_at': datetime.date.today().isoformat(),
+                'results': results
+            }, f, indent=2)
+            f.write('\n')
+        print_success(f"Baseline written to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+        print_info(f"No baseline at {args.baseline}; run with --save to record one")
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print_error(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print_success("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
 import sys
 import psycopg2
+from psycopg2 import sql
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from colorama import init, Fore, Style
 
@@ -39,14 +42,15 @@ def print_info(message):
     """Print an info message."""
     print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
 
-def get_db_connection():
+def get_db_connection(verbose=True):
     """Connect to the PostgreSQL database server."""
     try:
-        print_info("Connecting to database...")
-        print_info(f"Host: {DB_CONFIG['host']}")
-        print_info(f"Port: {DB_CONFIG['port']}")
-        print_info(f"Database: {DB_CONFIG['database']}")
-        print_info(f"User: {DB_CONFIG['user']}")
+        if verbose:
+            print_info("Connecting to database...")
+            print_info(f"Host: {DB_CONFIG['host']}")
+            print_info(f"Port: {DB_CONFIG['port']}")
+            print_info(f"Database: {DB_CONFIG['database']}")
+            print_info(f"User: {DB_CONFIG['user']}")
         
         conn = psycopg2.connect(
             host=DB_CONFIG['host'],
@@ -56,7 +60,8 @@ def get_db_connection():
             password=DB_CONFIG['password']
         )
         
-        print_success("Database connection successful!")
+        if verbose:
+            print_success("Database connection successful!")
         return conn
     except (Exception, psycopg2.DatabaseError) as error:
         print_error(f"Error: {error}")
@@ -181,8 +186,189 @@ def check_records():
     finally:
         conn.close()
 
+def format_bytes(size):
+    """Format a byte count for display."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def get_table_profiles(conn):
+    """Get estimated rows, sizes, dead tuples and scan counts for every table.
+
+    Everything comes from the statistics collector and catalog in a single
+    query, so no table is read.
+    """
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT
+                s.relname,
+                GREATEST(c.reltuples, 0)::bigint AS estimated_rows,
+                s.n_live_tup,
+                s.n_dead_tup,
+                pg_table_size(c.oid) AS table_bytes,
+                pg_indexes_size(c.oid) AS index_bytes,
+                pg_total_relation_size(c.oid) AS total_bytes,
+                s.seq_scan,
+                s.seq_tup_read,
+                COALESCE(s.idx_scan, 0) AS idx_scan,
+                GREATEST(s.last_vacuum, s.last_autovacuum) AS last_vacuum,
+                GREATEST(s.last_analyze, s.last_autoanalyze) AS last_analyze
+            FROM pg_stat_user_tables s
+            JOIN pg_class c ON c.oid = s.relid
+            WHERE s.schemaname = 'public'
+            ORDER BY total_bytes DESC;
+        """)
+        columns = [desc[0] for desc in cursor.description]
+        profiles = []
+        for row in cursor.fetchall():
+            profile = dict(zip(columns, row))
+            for key in ('last_vacuum', 'last_analyze'):
+                if profile[key] is not None:
+                    profile[key] = profile[key].isoformat()
+            # Dead tuples approximate the space vacuum has yet to reclaim
+            tuples = profile['n_live_tup'] + profile['n_dead_tup']
+            profile['dead_ratio'] = round(profile['n_dead_tup'] / tuples, 4) if tuples else 0.0
+            profile['estimated_bloat_bytes'] = int(profile['table_bytes'] * profile['dead_ratio'])
+            profiles.append(profile)
+        return profiles
+    except Exception as e:
+        print_error(f"Error profiling tables: {e}")
+        return []
+    finally:
+        cursor.close()
+
+def get_index_profiles(conn):
+    """Get size and usage for every index, flagging unused ones.
+
+    Primary key and unique indexes are never reported as unused because
+    they enforce constraints even when no query scans them.
+    """
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT
+                s.relname AS table_name,
+                s.indexrelname AS index_name,
+                s.idx_scan,
+                s.idx_tup_read,
+                pg_relation_size(s.indexrelid) AS index_bytes,
+                i.indisunique OR i.indisprimary AS enforces_constraint
+            FROM pg_stat_user_indexes s
+            JOIN pg_index i ON i.indexrelid = s.indexrelid
+            WHERE s.schemaname = 'public'
+            ORDER BY index_bytes DESC;
+        """)
+        columns = [desc[0] for desc in cursor.description]
+        indexes = []
+        for row in cursor.fetchall():
+            index = dict(zip(columns, row))
+            index['unused'] = index['idx_scan'] == 0 and not index['enforces_constraint']
+            indexes.append(index)
+        return indexes
+    except Exception as e:
+        print_error(f"Error profiling indexes: {e}")
+        return []
+    finally:
+        cursor.close()
+
+def count_table_exact(table):
+    """Count rows in one table on its own connection."""
+    conn = get_db_connection(verbose=False)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table)))
+        return table, cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_exact_counts(tables, workers=4):
+    """Run exact COUNT(*) queries across tables in parallel."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(executor.map(count_table_exact, tables))
+
+def profile_database(exact=False, workers=4, as_json=False, output=None):
+    """Profile data volume, sizes, bloat and index usage from the catalog.
+
+    A handful of catalog queries replace the serial COUNT(*) scans of
+    check_records. ``exact`` adds real row counts, gathered in parallel.
+    """
+    conn = get_db_connection(verbose=not as_json)
+    
+    try:
+        tables = get_table_profiles(conn)
+        indexes = get_index_profiles(conn)
+    finally:
+        conn.close()
+
+    if exact:
+        counts = get_exact_counts([t['relname'] for t in tables], workers)
+        for table in tables:
+            table['exact_rows'] = counts.get(table['relname'])
+
+    report = {
+        'database': DB_CONFIG['database'],
+        'tables': tables,
+        'indexes': indexes,
+        'unused_indexes': [i['index_name'] for i in indexes if i['unused']],
+        'totals': {
+            'table_bytes': sum(t['table_bytes'] for t in tables),
+            'index_bytes': sum(t['index_bytes'] for t in tables),
+            'estimated_rows': sum(t['estimated_rows'] for t in tables)
+        }
+    }
+
+    if as_json or output:
+        text = json.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(text)
+            if not as_json:
+                print_success(f"Profile written to {output}")
+        if as_json:
+            print(text)
+        return report
+
+    print_header("Table Profile")
+    for table in tables:
+        rows = table.get('exact_rows', table['estimated_rows'])
+        print(f"{Fore.MAGENTA}{table['relname']}{Style.RESET_ALL}: ~{rows} rows, "
+              f"table {format_bytes(table['table_bytes'])}, indexes {format_bytes(table['index_bytes'])}, "
+              f"dead {table['dead_ratio']:.1%}, seq/idx scans {table['seq_scan']}/{table['idx_scan']}")
+
+    print_header("Index Usage")
+    for index in indexes:
+        message = (f"{index['table_name']}.{index['index_name']}: {index['idx_scan']} scans, "
+                   f"{format_bytes(index['index_bytes'])}")
+        if index['unused']:
+            print_error(f"{message} (unused)")
+        else:
+            print_info(message)
+    return report
+
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description='Inspect the EHR database schema and data volume')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile sizes, estimated rows, bloat and index usage from catalog views')
+    parser.add_argument('--exact', action='store_true',
+                        help='With --profile, also run exact row counts in parallel')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Parallel connections used for exact row counts')
+    parser.add_argument('--json', action='store_true',
+                        help='With --profile, print the report as JSON')
+    parser.add_argument('--output', help='With --profile, write the JSON report to this file')
+    args = parser.parse_args()
+
+    if args.profile:
+        profile_database(exact=args.exact, workers=args.workers, as_json=args.json, output=args.output)
+        return
+
     print_header("Database Schema Analysis")
     
     # Check schema
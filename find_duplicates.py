@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import psycopg2
+import psycopg2.extras
+from multiprocessing import Pool
+from dotenv import load_dotenv
+from colorama import init, Fore, Style
+
+import mpi
+
+# Initialize colorama for colored output
+init()
+
+# Load environment variables from .env file (configurable via ENV_PATH)
+env_path = os.getenv('ENV_PATH', '.env')
+load_dotenv(env_path)
+
+# Database connection parameters
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'ehr_db'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'postgres')
+}
+
+# Blocks are read from the server and handed to the workers in batches
+BLOCK_BATCH = 2000
+
+# One row per block: patients sharing DOB + phonetic last name, an email, or
+# a phone number. Blocks larger than max_block (shared family phones,
+# placeholder emails) are skipped, since every pair in a block is compared.
+BLOCK_QUERY = """
+    WITH blocks AS (
+        SELECT 'dob+last_name' AS block_key, array_agg(patient_id) AS members
+        FROM patients
+        WHERE last_name_dmeta <> ''
+        GROUP BY date_of_birth, last_name_dmeta
+        HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 'email', array_agg(patient_id)
+        FROM patients
+        WHERE email_normalized IS NOT NULL
+        GROUP BY email_normalized
+        HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 'phone', array_agg(patient_id)
+        FROM patients
+        WHERE phone_digits IS NOT NULL
+        GROUP BY phone_digits
+        HAVING COUNT(*) > 1
+    )
+    SELECT b.block_key, cardinality(b.members) > %(max_block)s AS oversized,
+           CASE WHEN cardinality(b.members) > %(max_block)s THEN NULL ELSE (
+               SELECT json_agg(json_build_array(p.patient_id, p.first_name, p.last_name,
+                                                p.date_of_birth, p.gender,
+                                                p.email_normalized, p.phone_digits))
+               FROM patients p
+               WHERE p.patient_id = ANY(b.members)
+           ) END AS rows
+    FROM blocks b
+"""
+
+def print_header(message):
+    """Print a formatted header message."""
+    print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{message.center(70)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
+
+def print_success(message):
+    """Print a success message."""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print an error message."""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+
+def print_info(message):
+    """Print an info message."""
+    print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
+
+def get_db_connection():
+    """Connect to the PostgreSQL database server."""
+    try:
+        return psycopg2.connect(
+            host=DB_CONFIG['host'],
+            port=DB_CONFIG['port'],
+            database=DB_CONFIG['database'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password']
+        )
+    except (Exception, psycopg2.DatabaseError) as error:
+        print_error(f"Error connecting to database: {error}")
+        sys.exit(1)
+
+def has_blocking_keys(conn):
+    """Check that migration 9 (duplicate patient detection) has been applied."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_name = 'patients' AND column_name IN ('last_name_dmeta', 'email_normalized', 'phone_digits')
+            """
+        )
+        return cur.fetchone()[0] == 3
+
+def merge_pair(found, pair):
+    """Keep the best score and all reasons for a pair seen in several blocks."""
+    newer, older, score, reasons = pair
+    previous = found.get((newer, older))
+    if previous is None:
+        found[(newer, older)] = (score, list(reasons))
+    else:
+        found[(newer, older)] = (max(score, previous[0]), sorted(set(previous[1]) | set(reasons)))
+
+def scan(conn, workers, threshold, max_block):
+    """Score every block in parallel; returns ({(newer, older): (score, reasons)}, stats)."""
+    stats = {'blocks': 0, 'oversized_blocks': 0, 'comparisons': 0}
+    found = {}
+    score = functools.partial(mpi.score_block, threshold=threshold)
+    with Pool(workers) as pool, conn.cursor(name='duplicate_blocks') as cur:
+        cur.itersize = BLOCK_BATCH
+        cur.execute(BLOCK_QUERY, {'max_block': max_block})
+        while True:
+            batch = cur.fetchmany(BLOCK_BATCH)
+            if not batch:
+                break
+            blocks = []
+            for block_key, oversized, rows in batch:
+                if oversized:
+                    stats['oversized_blocks'] += 1
+                    continue
+                stats['blocks'] += 1
+                stats['comparisons'] += len(rows) * (len(rows) - 1) // 2
+                blocks.append(rows)
+            for pairs in pool.imap_unordered(score, blocks, chunksize=64):
+                for pair in pairs:
+                    merge_pair(found, pair)
+    conn.commit()
+    return found, stats
+
+def save_candidates(conn, found):
+    """Upsert the pairs into patient_duplicate_candidates, leaving reviewed pairs alone."""
+    with conn.cursor() as cur:
+        psycopg2.extras.execute_values(
+            cur,
+            """
+            INSERT INTO patient_duplicate_candidates (patient_id, duplicate_of, score, reasons)
+            VALUES %s
+            ON CONFLICT (patient_id, duplicate_of) DO UPDATE
+                SET score = EXCLUDED.score, reasons = EXCLUDED.reasons, detected_at = CURRENT_TIMESTAMP
+                WHERE patient_duplicate_candidates.status = 'open'
+            """,
+            [(newer, older, score, reasons) for (newer, older), (score, reasons) in found.items()],
+            page_size=1000
+        )
+    conn.commit()
+
+def main():
+    """Find likely duplicate patients across the whole table."""
+    parser = argparse.ArgumentParser(description='Batch duplicate patient detection using blocking keys')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Parallel scoring processes')
+    parser.add_argument('--threshold', type=float, default=mpi.MPI_REVIEW_THRESHOLD,
+                        help='Lowest score recorded as a possible duplicate')
+    parser.add_argument('--max-block', type=int, default=200, help='Skip blocks with more patients than this')
+    parser.add_argument('--top', type=int, default=20, help='Number of best matches to print')
+    parser.add_argument('--dry-run', action='store_true', help='Report without writing patient_duplicate_candidates')
+    parser.add_argument('--json', action='store_true', help='Print the matches as JSON')
+    args = parser.parse_args()
+
+    if not args.json:
+        print_header("Duplicate Patient Detection")
+    conn = get_db_connection()
+    try:
+        if not has_blocking_keys(conn):
+            print_error("Blocking key columns are missing; run python setup_db_tables.py first")
+            sys.exit(1)
+
+        started = time.perf_counter()
+        found, stats = scan(conn, args.workers, args.threshold, args.max_block)
+        elapsed = time.perf_counter() - started
+        if not args.dry_run and found:
+            save_candidates(conn, found)
+
+        matches = sorted(
+            ({'patient_id': newer, 'duplicate_of': older, 'score': score, 'reasons': reasons}
+             for (newer, older), (score, reasons) in found.items()),
+            key=lambda match: match['score'], reverse=True
+        )
+        if args.json:
+            print(json.dumps({'stats': stats, 'matches': matches}, indent=2))
+            return
+
+        print_info(f"{stats['blocks']} blocks, {stats['comparisons']} comparisons, "
+                   f"{args.workers} workers, {elapsed:.1f} s")
+        if stats['oversized_blocks']:
+            print_info(f"Skipped {stats['oversized_blocks']} blocks larger than {args.max_block} patients")
+        for match in matches[:args.top]:
+            color = Fore.RED if match['score'] >= mpi.MPI_MATCH_THRESHOLD else Fore.YELLOW
+            print(f"{color}{match['score']:.3f}{Style.RESET_ALL}  #{match['patient_id']} duplicates "
+                  f"#{match['duplicate_of']}  ({', '.join(match['reasons'])})")
+        likely = sum(1 for match in matches if match['score'] >= mpi.MPI_MATCH_THRESHOLD)
+        print_success(f"{len(matches)} possible duplicates, {likely} likely"
+                      + ("" if args.dry_run else "; saved to patient_duplicate_candidates"))
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import sys
+import json
+import math
+import queue
+import random
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+import requests
+from colorama import init, Fore, Style
+
+# Initialize colorama for colored output
+init()
+
+# Service ports, matching start_servers.py
+API_PORT = 8001  # Login API
+PATIENT_API_PORT = 8002  # Patient API
+APPOINTMENTS_API_PORT = 8003  # Appointments API
+
+# Relative weight of each user action in a clinic's traffic
+DEFAULT_MIX = {
+    'login': 5,
+    'dashboard': 20,
+    'search': 30,
+    'detail': 25,
+    'edit': 5,
+    'appointment': 8,
+    'note': 7
+}
+
+SEARCH_TERMS = ['smith', 'johnson', 'williams', 'brown', 'garcia', 'miller', 'davis', 'martinez']
+
+def print_header(message):
+    """Print a formatted header message."""
+    print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{message.center(70)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
+
+def print_success(message):
+    """Print a success message."""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print an error message."""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+
+def print_info(message):
+    """Print an info message."""
+    print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
+
+class Recorder:
+    """Thread-safe collection of per-endpoint latency samples and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.queue_delays = []
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append(latency)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def record_queue_delay(self, delay):
+        with self.lock:
+            self.queue_delays.append(delay)
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class Client:
+    """Issues requests against the three services and records each call."""
+
+    def __init__(self, args, recorder, context):
+        self.args = args
+        self.recorder = recorder
+        self.context = context
+        self.session = requests.Session()
+
+    def url(self, port, path):
+        return f"http://{self.args.host}:{port}{path}"
+
+    def call(self, endpoint, method, port, path, **kwargs):
+        """Send one request; ``endpoint`` is the route template used for grouping."""
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(port, path), timeout=self.args.timeout, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response = None
+            ok = False
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+        return response
+
+    def patient_id(self):
+        return random.choice(self.context['patient_ids'])
+
+    # Scenarios -----------------------------------------------------------
+
+    def login(self):
+        self.call('POST /api/login', 'POST', API_PORT, '/api/login', json={
+            'username': self.args.username,
+            'password': self.args.password
+        })
+
+    def dashboard(self):
+        self.call('GET /api/dashboard-stats', 'GET', PATIENT_API_PORT, '/api/dashboard-stats')
+        self.call('GET /api/patients', 'GET', PATIENT_API_PORT, '/api/patients?limit=10&offset=0')
+        self.call('GET /api/appointments/stats', 'GET', APPOINTMENTS_API_PORT, '/api/appointments/stats')
+
+    def search(self):
+        # One request per keystroke after the second character, as the
+        # type-ahead in the patient list does
+        term = random.choice(SEARCH_TERMS)
+        for length in range(2, len(term) + 1):
+            self.call('GET /api/patients?search', 'GET', PATIENT_API_PORT,
+                      f'/api/patients?search={term[:length]}&limit=10')
+            time.sleep(self.args.keystroke_delay)
+
+    def detail(self):
+        patient_id = self.patient_id()
+        self.call('GET /api/patients/<id>', 'GET', PATIENT_API_PORT, f'/api/patients/{patient_id}')
+        self.call('GET /api/patients/<id>/records', 'GET', PATIENT_API_PORT, f'/api/patients/{patient_id}/records')
+        self.call('GET /api/patients/<id>/notes', 'GET', PATIENT_API_PORT, f'/api/patients/{patient_id}/notes')
+
+    def edit(self):
+        patient_id = self.patient_id()
+        self.call('PUT /api/patients/<id>', 'PUT', PATIENT_API_PORT, f'/api/patients/{patient_id}', json={
+            'contact_number': f"555-{random.randint(100, 999)}-{random.randint(1000, 9999)}"
+        })
+
+    def appointment(self):
+        # Spread bookings over the next year on a 15 minute grid to keep
+        # overlap rejections rare
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(
+            days=random.randint(1, 365), minutes=15 * random.randint(0, 36)
+        )
+        self.call('POST /api/appointments', 'POST', APPOINTMENTS_API_PORT, '/api/appointments', json={
+            'patient_id': self.patient_id(),
+            'provider_id': self.context.get('provider_id'),
+            'appointment_time': start.isoformat(),
+            'duration_minutes': 15,
+            'reason': 'Load test follow-up'
+        })
+
+    def note(self):
+        patient_id = self.patient_id()
+        self.call('POST /api/patients/<id>/notes', 'POST', PATIENT_API_PORT, f'/api/patients/{patient_id}/notes', json={
+            'note': f"Load test note {random.randint(0, 10 ** 6)}: vitals stable, follow up in two weeks."
+        })
+
+def discover_context(args):
+    """Log in once and sample real patient ids to drive the scenarios."""
+    context = {'patient_ids': [], 'provider_id': None}
+    try:
+        response = requests.post(f"http://{args.host}:{API_PORT}/api/login", json={
+            'username': args.username, 'password': args.password
+        }, timeout=args.timeout)
+        if response.ok:
+            context['provider_id'] = response.json().get('user', {}).get('id')
+        response = requests.get(f"http://{args.host}:{PATIENT_API_PORT}/api/patients?limit=100", timeout=args.timeout)
+        if response.ok:
+            context['patient_ids'] = [p['patient_id'] for p in response.json().get('patients', [])]
+    except requests.RequestException as e:
+        print_error(f"Could not reach services: {e}")
+    return context
+
+def parse_mix(value):
+    """Parse ``scenario=weight,...`` overrides on top of the default mix."""
+    mix = dict(DEFAULT_MIX)
+    if value:
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError(f"unknown scenario '{name}'")
+            mix[name] = float(weight)
+    return mix
+
+def run_load(args, context):
+    """Drive an open-loop arrival process into a pool of worker threads.
+
+    Sessions arrive as a Poisson process at ``rate`` per second regardless
+    of how fast the services answer, so a slow backend shows up as queueing
+    and tail latency instead of silently lowering the offered load.
+    """
+    recorder = Recorder()
+    work = queue.Queue()
+    scenarios = [name for name, weight in args.mix.items() if weight > 0]
+    weights = [args.mix[name] for name in scenarios]
+    scenario_counts = {name: 0 for name in scenarios}
+
+    def worker():
+        client = Client(args, recorder, context)
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            scheduled, scenario = item
+            recorder.record_queue_delay(time.perf_counter() - scheduled)
+            getattr(client, scenario)()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    next_arrival = started
+    while next_arrival < deadline:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        scenario = random.choices(scenarios, weights)[0]
+        scenario_counts[scenario] += 1
+        work.put((next_arrival, scenario))
+        next_arrival += random.expovariate(args.rate)
+
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return recorder, scenario_counts, elapsed
+
+def summarize(recorder, scenario_counts, elapsed, args):
+    """Build the JSON-serializable results document."""
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        errors = recorder.errors.get(endpoint, 0)
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'errors': errors,
+            'error_rate': round(errors / len(ordered), 4),
+            'throughput_rps': round(len(ordered) / elapsed, 2),
+            'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+            'max_ms': round(ordered[-1] * 1000, 2)
+        }
+    delays = sorted(recorder.queue_delays)
+    total_requests = sum(e['requests'] for e in endpoints.values())
+    return {
+        'started_at': datetime.now().isoformat(),
+        'label': args.label,
+        'config': {
+            'host': args.host,
+            'duration_s': args.duration,
+            'rate_per_s': args.rate,
+            'concurrency': args.concurrency,
+            'mix': args.mix
+        },
+        'elapsed_s': round(elapsed, 2),
+        'sessions': scenario_counts,
+        'total_requests': total_requests,
+        'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0,
+        'queue_delay_p99_ms': round(percentile(delays, 99) * 1000, 2) if delays else None,
+        'endpoints': endpoints
+    }
+
+def print_report(results, baseline=None):
+    """Print the per-endpoint table, with deltas against a baseline run."""
+    print_header("Load Test Results")
+    print_info(f"{results['total_requests']} requests in {results['elapsed_s']}s "
+               f"({results['throughput_rps']} req/s), queue delay p99 {results['queue_delay_p99_ms']} ms")
+    print(f"\n{'endpoint':<36}{'reqs':>7}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, stats in results['endpoints'].items():
+        line = (f"{endpoint:<36}{stats['requests']:>7}{stats['error_rate'] * 100:>6.1f}%"
+                f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+        previous = (baseline or {}).get('endpoints', {}).get(endpoint)
+        if previous and previous['p99_ms']:
+            change = (stats['p99_ms'] - previous['p99_ms']) / previous['p99_ms']
+            color = Fore.RED if change > 0.1 else Fore.GREEN if change < -0.1 else ''
+            line += f"  {color}p99 {change:+.0%}{Style.RESET_ALL}"
+        print(line)
+    failing = [e for e, s in results['endpoints'].items() if s['error_rate'] > 0]
+    if failing:
+        print_error(f"Errors on: {', '.join(failing)}")
+    else:
+        print_success("No request errors")
+
+def main():
+    """Replay a realistic clinic traffic mix against the running services."""
+    parser = argparse.ArgumentParser(description='Load test the EHR services')
+    parser.add_argument('--host', default='localhost', help='Host running the services')
+    parser.add_argument('--duration', type=float, default=60, help='Test duration in seconds')
+    parser.add_argument('--rate', type=float, default=10, help='User sessions started per second')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent worker threads')
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='Scenario weight overrides, e.g. "search=50,login=0"')
+    parser.add_argument('--username', default='admin', help='Login used by the login scenario')
+    parser.add_argument('--password', default='adminpass123', help='Password for --username')
+    parser.add_argument('--keystroke-delay', type=float, default=0.15,
+                        help='Seconds between search keystrokes')
+    parser.add_argument('--timeout', type=float, default=10, help='Per-request timeout in seconds')
+    parser.add_argument('--label', default='', help='Free-form label stored with the results, e.g. a git sha')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--baseline', help='Results JSON from an earlier run to compare against')
+    args = parser.parse_args()
+
+    print_header("EHR Load Test")
+    context = discover_context(args)
+    if not context['patient_ids']:
+        print_error("No patients found; start the services and load data with generate_realistic_data.py")
+        sys.exit(1)
+    print_info(f"Using {len(context['patient_ids'])} patients, provider id {context['provider_id']}")
+    print_info(f"Running for {args.duration}s at {args.rate} sessions/s with {args.concurrency} workers...")
+
+    recorder, scenario_counts, elapsed = run_load(args, context)
+    results = summarize(recorder, scenario_counts, elapsed, args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print_success(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
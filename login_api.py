@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import logging
 import psycopg2
 import hashlib
 from passlib.hash import bcrypt
@@ -9,6 +10,9 @@ from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+from request_profiler import init_profiling
+from tracing import init_tracing, traced, TracingCursor
+from request_logging import init_logging
 
 # Load environment variables from .env file (configurable via ENV_PATH)
 env_path = os.getenv('ENV_PATH', '.env')
@@ -25,7 +29,13 @@ DB_CONFIG = {
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+init_profiling(app, 'login_api')
+init_tracing(app, 'login_api')
+init_logging(app, 'login_api')
 
+logger = logging.getLogger('login_api')
+
+@traced('db.connect')
 def get_db_connection():
     """Connect to the PostgreSQL database server"""
     try:
@@ -34,11 +44,12 @@ def get_db_connection():
             port=DB_CONFIG['port'],
             database=DB_CONFIG['database'],
             user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
+            password=DB_CONFIG['password'],
+            cursor_factory=TracingCursor
         )
         return conn
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Error connecting to database: {error}")
+        logger.error(f"Error connecting to database: {error}")
         return None
 
 def hash_password(password):
@@ -59,6 +70,16 @@ def verify_password(password: str, stored_hash: str) -> bool:
         return bcrypt.verify(password, stored_hash)
     return hash_password(password) == stored_hash
 
+def create_token(username):
+    """Create a session token for a user."""
+    timestamp = datetime.now().isoformat()
+    return base64.b64encode(f"{username}:{timestamp}".encode()).decode()
+
+def decode_token(token):
+    """Return the username a session token was issued to."""
+    decoded = base64.b64decode(token).decode()
+    return decoded.split(':', 1)[0]
+
 @app.route('/api/login', methods=['POST'])
 def login():
     """API endpoint to handle user login"""
@@ -104,13 +125,12 @@ def login():
                 )
                 conn.commit()
             except Exception as e:
-                print(f"Error recording failed login: {e}")
+                logger.exception("Error recording failed login")
             
             return jsonify({"success": False, "message": "Invalid username or password"}), 401
         
         # Login successful, create token
-        timestamp = datetime.now().isoformat()
-        token = base64.b64encode(f"{username}:{timestamp}".encode()).decode()
+        token = create_token(username)
         
         # Record successful login
         try:
@@ -123,7 +143,7 @@ def login():
             )
             conn.commit()
         except Exception as e:
-            print(f"Error recording successful login: {e}")
+            logger.exception("Error recording successful login")
         
         return jsonify({
             "success": True,
@@ -136,7 +156,7 @@ def login():
         })
         
     except Exception as e:
-        print(f"Login error: {e}")
+        logger.exception("Login error")
         return jsonify({"success": False, "message": "Server error"}), 500
     finally:
         cursor.close()
@@ -150,8 +170,7 @@ def create_user():
         return "Unauthorized", 401
 
     try:
-        decoded = base64.b64decode(token).decode()
-        requesting_user = decoded.split(':', 1)[0]
+        requesting_user = decode_token(token)
     except Exception:
         return "Invalid token", 401
 
@@ -204,7 +223,7 @@ def create_user():
         return jsonify({"success": True, "user_id": new_id})
     except Exception as e:
         conn.rollback()
-        print(f"Create user error: {e}")
+        logger.exception("Create user error")
         return jsonify({"success": False, "message": "Server error"}), 500
     finally:
         cursor.close()
@@ -253,7 +272,7 @@ def change_password():
         return jsonify({"success": True, "message": "Password updated"})
 
     except Exception as e:
-        print(f"Change password error: {e}")
+        logger.exception("Change password error")
         conn.rollback()
         return jsonify({"success": False, "message": "Server error"}), 500
     finally:
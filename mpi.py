@@ -0,0 +1,192 @@
+import os
+import re
+
+# Pairs scoring at least this are treated as the same person
+MPI_MATCH_THRESHOLD = float(os.getenv('MPI_MATCH_THRESHOLD', '0.9'))
+# Pairs scoring at least this are recorded for manual review
+MPI_REVIEW_THRESHOLD = float(os.getenv('MPI_REVIEW_THRESHOLD', '0.75'))
+# Most candidates taken from one block for an inline check
+MPI_BLOCK_LIMIT = 50
+
+# Field weights; a field only counts when both records have a value
+WEIGHTS = {
+    'last_name': 0.25,
+    'first_name': 0.2,
+    'date_of_birth': 0.25,
+    'email': 0.15,
+    'phone': 0.1,
+    'gender': 0.05
+}
+
+# Columns every compared record needs, as selected from patients
+MATCH_COLUMNS = ['patient_id', 'first_name', 'last_name', 'date_of_birth',
+                 'gender', 'email_normalized', 'phone_digits']
+
+# Candidates sharing a block key with the new record: DOB + phonetic last
+# name, normalized email, or normalized phone. Each block is index-driven
+# (migration 9) and capped, which keeps the check within a few milliseconds.
+CANDIDATE_QUERY = f"""
+    SELECT {', '.join(MATCH_COLUMNS)}
+    FROM patients
+    WHERE patient_id IN (
+        (SELECT patient_id FROM patients
+         WHERE date_of_birth = %(dob)s AND last_name_dmeta = dmetaphone(%(last_name)s)
+         LIMIT {MPI_BLOCK_LIMIT})
+        UNION
+        (SELECT patient_id FROM patients WHERE email_normalized = %(email)s LIMIT {MPI_BLOCK_LIMIT})
+        UNION
+        (SELECT patient_id FROM patients WHERE phone_digits = %(phone)s LIMIT {MPI_BLOCK_LIMIT})
+    )
+"""
+
+def as_text(value):
+    """Request fields as text; anything that is not a string is coerced."""
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+def normalize_email(email):
+    """Match the patients.email_normalized generated column."""
+    email = (as_text(email) or '').strip().lower()
+    return email or None
+
+def normalize_phone(phone):
+    """Match the patients.phone_digits generated column (last ten digits)."""
+    digits = re.sub(r'[^0-9]', '', as_text(phone) or '')[-10:]
+    return digits or None
+
+def jaro_winkler(a, b):
+    """Jaro-Winkler similarity of two strings, case-insensitive, 0..1."""
+    a, b = (a or '').lower().strip(), (b or '').lower().strip()
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, char in enumerate(a):
+        for j in range(max(0, i - window), min(i + window + 1, len(b))):
+            if not b_matched[j] and b[j] == char:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    a_chars = [char for char, matched in zip(a, a_matched) if matched]
+    b_chars = [char for char, matched in zip(b, b_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_chars, b_chars)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+def match_record(data):
+    """Shape an incoming patient payload like a MATCH_COLUMNS row."""
+    return {
+        'patient_id': None,
+        'first_name': as_text(data.get('first_name')),
+        'last_name': as_text(data.get('last_name')),
+        'date_of_birth': as_text(data.get('date_of_birth')),
+        'gender': as_text(data.get('gender')),
+        'email_normalized': normalize_email(data.get('email')),
+        'phone_digits': normalize_phone(data.get('contact_number'))
+    }
+
+def score_pair(a, b):
+    """Score how likely two patient records are the same person.
+
+    Returns (score, reasons) where score is the weighted share of agreement
+    over the fields both records have, and reasons lists what agreed.
+    """
+    earned = possible = 0.0
+    reasons = []
+
+    straight = jaro_winkler(a['first_name'], b['first_name']) + jaro_winkler(a['last_name'], b['last_name'])
+    swapped = jaro_winkler(a['first_name'], b['last_name']) + jaro_winkler(a['last_name'], b['first_name'])
+    if swapped > straight:
+        first = jaro_winkler(a['first_name'], b['last_name'])
+        last = jaro_winkler(a['last_name'], b['first_name'])
+        reasons.append('names swapped')
+    else:
+        first = jaro_winkler(a['first_name'], b['first_name'])
+        last = jaro_winkler(a['last_name'], b['last_name'])
+    for field, similarity in (('last_name', last), ('first_name', first)):
+        if a[field] and b[field]:
+            possible += WEIGHTS[field]
+            # Below 0.8 Jaro-Winkler the names are effectively different
+            earned += WEIGHTS[field] * max(0.0, (similarity - 0.8) / 0.2)
+            if similarity >= 0.9:
+                reasons.append(field)
+
+    dob_a, dob_b = str(a['date_of_birth'] or '')[:10], str(b['date_of_birth'] or '')[:10]
+    if dob_a and dob_b:
+        possible += WEIGHTS['date_of_birth']
+        if dob_a == dob_b:
+            earned += WEIGHTS['date_of_birth']
+            reasons.append('date_of_birth')
+        elif dob_a[:4] == dob_b[:4] and dob_a[5:7] == dob_b[8:10] and dob_a[8:10] == dob_b[5:7]:
+            earned += WEIGHTS['date_of_birth'] * 0.8
+            reasons.append('date_of_birth transposed')
+
+    for field, column in (('email', 'email_normalized'), ('phone', 'phone_digits')):
+        if a[column] and b[column]:
+            possible += WEIGHTS[field]
+            if a[column] == b[column]:
+                earned += WEIGHTS[field]
+                reasons.append(field)
+
+    if a['gender'] and b['gender']:
+        possible += WEIGHTS['gender']
+        if a['gender'].strip().lower() == b['gender'].strip().lower():
+            earned += WEIGHTS['gender']
+
+    return (round(earned / possible, 3) if possible else 0.0), reasons
+
+def find_duplicates(cursor, data, threshold=MPI_REVIEW_THRESHOLD):
+    """Return existing patients that may be the person described by ``data``.
+
+    Each result is a dict with patient_id, name, date_of_birth, score and
+    reasons, best match first.
+    """
+    record = match_record(data)
+    cursor.execute(CANDIDATE_QUERY, {
+        'dob': record['date_of_birth'] or None,
+        'last_name': record['last_name'] or '',
+        'email': record['email_normalized'],
+        'phone': record['phone_digits']
+    })
+    matches = []
+    for row in cursor.fetchall():
+        candidate = dict(zip(MATCH_COLUMNS, row))
+        score, reasons = score_pair(record, candidate)
+        if score >= threshold:
+            matches.append({
+                'patient_id': candidate['patient_id'],
+                'name': f"{candidate['last_name']}, {candidate['first_name']}",
+                'date_of_birth': str(candidate['date_of_birth']),
+                'score': score,
+                'reasons': reasons
+            })
+    matches.sort(key=lambda match: match['score'], reverse=True)
+    return matches
+
+def score_block(rows, threshold=MPI_REVIEW_THRESHOLD):
+    """Compare every pair within one block of MATCH_COLUMNS rows.
+
+    Returns (newer_id, older_id, score, reasons) for pairs at or above
+    ``threshold``.
+    """
+    records = [dict(zip(MATCH_COLUMNS, row)) for row in rows]
+    pairs = []
+    for i, a in enumerate(records):
+        for b in records[i + 1:]:
+            score, reasons = score_pair(a, b)
+            if score >= threshold:
+                newer, older = max(a['patient_id'], b['patient_id']), min(a['patient_id'], b['patient_id'])
+                pairs.append((newer, older, score, reasons))
+    return pairs
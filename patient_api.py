@@ -1,11 +1,21 @@
 import os
 import sys
 import json
+import base64
+import logging
 import psycopg2
+import psycopg2.extras
 import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+from request_profiler import init_profiling
+from tracing import init_tracing, traced, TracingCursor
+from request_logging import init_logging
+from singleflight import coalesce
+from search_cache import SearchCache
+from autocomplete import AutocompleteService, normalize_name
+import mpi
 
 # Load environment variables from .env file (configurable via ENV_PATH)
 env_path = os.getenv('ENV_PATH', '.env')
@@ -20,9 +30,332 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'postgres')
 }
 
+# Patient columns clients may set on create and update
+PATIENT_FIELDS = [
+    "first_name",
+    "last_name",
+    "date_of_birth",
+    "gender",
+    "contact_number",
+    "email",
+    "address",
+    "emergency_contact",
+    "emergency_contact_number",
+    "blood_type",
+    "rank",
+    "service",
+    "fmpc",
+    "allergies",
+    "medical_conditions"
+]
+
+# Sources merged into a patient's records timeline. Each entry is a SELECT
+# producing (source, id, occurred_at, description) for one patient, ordered
+# newest first so the (patient_id, <timestamp>) index drives it.
+TIMELINE_SOURCES = {
+    'visit': {
+        'timestamp': 'v.visit_date',
+        'query': """
+            SELECT 'visit'::text AS source, v.id, v.visit_date AS occurred_at,
+                   v.visit_type || COALESCE(': ' || v.reason_for_visit, '') AS description
+            FROM visits v
+            WHERE v.patient_id = %s {cursor}
+            ORDER BY v.visit_date DESC, v.id DESC
+            LIMIT %s
+        """
+    },
+    'medication': {
+        'timestamp': 'm.start_date',
+        'query': """
+            SELECT 'medication'::text AS source, m.id, m.start_date::timestamp AS occurred_at,
+                   m.medication_name || ' ' || m.dosage || ', ' || m.frequency AS description
+            FROM medications m
+            WHERE m.patient_id = %s {cursor}
+            ORDER BY m.start_date DESC, m.id DESC
+            LIMIT %s
+        """
+    },
+    'appointment': {
+        'timestamp': 'a.appointment_time',
+        'query': """
+            SELECT 'appointment'::text AS source, a.id, a.appointment_time AS occurred_at,
+                   a.status || COALESCE(': ' || a.reason, '') AS description
+            FROM appointments a
+            WHERE a.patient_id = %s {cursor}
+            ORDER BY a.appointment_time DESC, a.id DESC
+            LIMIT %s
+        """
+    },
+    'note': {
+        'timestamp': 'n.created_at',
+        'query': """
+            SELECT 'note'::text AS source, n.id, n.created_at AS occurred_at,
+                   n.note AS description
+            FROM patient_notes n
+            WHERE n.patient_id = %s {cursor}
+            ORDER BY n.created_at DESC, n.id DESC
+            LIMIT %s
+        """
+    }
+}
+
+MAX_PAGE_SIZE = 200
+MAX_NOTE_BATCH = 5000
+
+# Columns returned by the patient list and search
+PATIENT_LIST_COLUMNS = """
+    p.patient_id, p.first_name, p.last_name, p.date_of_birth, p.gender,
+    p.contact_number, p.email, p.blood_type, p.rank, p.service,
+    p.allergies, p.medical_conditions
+"""
+
+# Search result cache: total rows held, largest match set kept whole for
+# in-memory refinement, and how long entries live (writes by other
+# processes become visible after this)
+SEARCH_CACHE_MAX_ROWS = int(os.getenv('SEARCH_CACHE_MAX_ROWS', '20000'))
+SEARCH_REFINE_MAX_ROWS = int(os.getenv('SEARCH_REFINE_MAX_ROWS', '200'))
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '60'))
+
+MAX_AUTOCOMPLETE_RESULTS = 50
+
+# Words of a fuzzy search term that are matched; the rest are ignored
+FUZZY_MAX_WORDS = 4
+
+# Cohort filters: query parameter -> (column, how its comma-separated values
+# combine). Scalar columns match any of the values exactly (case included,
+# as stored, e.g. "Navy", "O+") through their B-tree index; the allergy and
+# condition arrays (lower case, migration 10) must contain all of them,
+# ignoring case, through their GIN index.
+COHORT_FILTERS = {
+    'service': ('p.service', 'any'),
+    'rank': ('p.rank', 'any'),
+    'blood_type': ('p.blood_type', 'any'),
+    'gender': ('p.gender', 'any'),
+    'condition': ('p.condition_list', 'all'),
+    'allergy': ('p.allergy_list', 'all')
+}
+
+# Facets counted for the patient list, in GROUPING() argument order
+PATIENT_FACETS = ['blood_type', 'service', 'rank', 'gender', 'condition']
+FACET_TOP_CONDITIONS = 10
+
+# Every facet of a filtered patient set in one pass. Distinct conditions are
+# unnested, so a patient is counted once for the scalar facets and the total
+# (its first condition row, or its only row when it has none) and once per
+# condition, even if its list repeats one. Only the grouped column is
+# non-NULL in a row, so COALESCE yields the facet value.
+FACET_QUERY = """
+    SELECT GROUPING(p.blood_type, p.service, p.rank, p.gender, c.condition),
+           COALESCE(p.blood_type, p.service, p.rank, p.gender, c.condition),
+           CASE WHEN GROUPING(c.condition) = 0 THEN COUNT(c.condition)
+                ELSE COUNT(*) FILTER (WHERE c.ord IS NULL OR c.ord = 1) END
+    FROM patients p
+    LEFT JOIN LATERAL (
+        SELECT d.condition, row_number() OVER () AS ord
+        FROM (SELECT DISTINCT unnest(p.condition_list) AS condition) d
+    ) c ON TRUE
+    WHERE {where}
+    GROUP BY GROUPING SETS ((p.blood_type), (p.service), (p.rank), (p.gender), (c.condition), ())
+"""
+
+# GROUPING() value of each grouping set in FACET_QUERY
+FACET_GROUPINGS = {
+    ((1 << len(PATIENT_FACETS)) - 1) ^ (1 << (len(PATIENT_FACETS) - 1 - i)): facet
+    for i, facet in enumerate(PATIENT_FACETS)
+}
+FACET_GROUPINGS[(1 << len(PATIENT_FACETS)) - 1] = 'total'
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+init_profiling(app, 'patient_api')
+init_tracing(app, 'patient_api')
+init_logging(app, 'patient_api')
+
+logger = logging.getLogger('patient_api')
+
+@traced('serialize.rows')
+def serialize_patient_rows(column_names, rows):
+    """Convert patient list rows to dictionaries with ISO formatted birth dates"""
+    patients = []
+    for row in rows:
+        patient = dict(zip(column_names, row))
+        if isinstance(patient['date_of_birth'], (datetime.date, datetime.datetime)):
+            patient['date_of_birth'] = patient['date_of_birth'].isoformat()
+        patients.append(patient)
+    return patients
+
+def normalize_search(term):
+    """Normalize a search term so equivalent searches share cache entries"""
+    return ' '.join(term.split()).lower()
+
+def patient_matches(patient, term):
+    """In-memory equivalent of the get_patients search predicate"""
+    return (term in (patient['first_name'] or '').lower()
+            or term in (patient['last_name'] or '').lower()
+            or term in str(patient['patient_id']))
+
+def build_fuzzy_search(term):
+    """Build the WHERE and score expressions for a typo-tolerant name search
+
+    Every word of the term has to match a first or last name, either by
+    Double Metaphone key (indexed generated columns) or by trigram
+    similarity (the pg_trgm indexes). Words shorter than three letters are
+    matched as name prefixes instead. The score averages the best trigram
+    similarity of each word, with a bonus for phonetic matches.
+    Returns (where_sql, where_params, score_sql, score_params).
+    """
+    conditions, where_params = [], []
+    scores, score_params = [], []
+    for word in term.split()[:FUZZY_MAX_WORDS]:
+        if len(word) < 3:
+            prefix = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(p.last_name ILIKE %s OR p.first_name ILIKE %s)")
+            where_params.extend([prefix, prefix])
+        else:
+            conditions.append(
+                """(
+                    p.last_name_dmeta IN (dmetaphone(%s), dmetaphone_alt(%s))
+                    OR p.last_name_dmeta_alt IN (dmetaphone(%s), dmetaphone_alt(%s))
+                    OR p.first_name_dmeta = dmetaphone(%s)
+                    OR p.last_name %% %s
+                    OR p.first_name %% %s
+                )"""
+            )
+            where_params.extend([word] * 7)
+        scores.append(
+            """GREATEST(similarity(p.last_name, %s), similarity(p.first_name, %s))
+               + CASE WHEN p.last_name_dmeta = dmetaphone(%s) OR p.first_name_dmeta = dmetaphone(%s)
+                      THEN 0.5 ELSE 0 END"""
+        )
+        score_params.extend([word] * 4)
+    score_sql = f"(({' + '.join(scores)}) / {len(scores) * 1.5})"
+    return ' AND '.join(conditions), where_params, score_sql, score_params
+
+def fuzzy_patient_search(cursor, term, limit, offset):
+    """Run a fuzzy name search and return (total, patients) ranked by match_score"""
+    where_sql, where_params, score_sql, score_params = build_fuzzy_search(term)
+    cursor.execute(f"SELECT COUNT(*) FROM patients p WHERE {where_sql}", where_params)
+    total_count = cursor.fetchone()[0]
+    cursor.execute(
+        f"""
+        SELECT {PATIENT_LIST_COLUMNS}, ROUND({score_sql}::numeric, 3)::float8 AS match_score
+        FROM patients p
+        WHERE {where_sql}
+        ORDER BY match_score DESC, p.last_name, p.first_name
+        LIMIT %s OFFSET %s
+        """,
+        score_params + where_params + [limit, offset]
+    )
+    column_names = [desc[0] for desc in cursor.description]
+    return total_count, serialize_patient_rows(column_names, cursor.fetchall())
+
+search_cache = SearchCache(
+    patient_matches,
+    max_rows=SEARCH_CACHE_MAX_ROWS,
+    refine_max_rows=SEARCH_REFINE_MAX_ROWS,
+    ttl=SEARCH_CACHE_TTL
+)
+
+def request_values(args, name):
+    """All comma-separated values of a repeatable query parameter"""
+    return [value for arg in args.getlist(name) for value in arg.split(',')]
+
+def build_cohort_filter(args):
+    """Build the WHERE clause for the cohort filters present in ``args``
+
+    Returns (where_sql, params, filters) where ``filters`` maps each filter
+    used to its list of values. Each filter is a separate indexable
+    condition, so Postgres can combine the indexes in one bitmap scan.
+    """
+    conditions, params, filters = [], [], {}
+    for name, (column, mode) in COHORT_FILTERS.items():
+        values = [v.strip() for v in request_values(args, name) if v.strip()]
+        if not values:
+            continue
+        if mode == 'all':
+            values = [' '.join(v.lower().split()) for v in values]
+            conditions.append(f"{column} @> %s::text[]")
+        else:
+            conditions.append(f"{column} = ANY(%s)")
+        params.append(values)
+        filters[name] = values
+    return ' AND '.join(conditions) or 'TRUE', params, filters
 
+def build_facets(rows, top_conditions):
+    """Shape (facet, value, count) rows as (total, {facet: [{value, count}]})
+
+    Values are ordered by count, conditions cut to the ``top_conditions``
+    most common, and empty counts dropped.
+    """
+    total = 0
+    facets = {facet: [] for facet in PATIENT_FACETS}
+    for facet, value, count in rows:
+        if facet == 'total':
+            total = count
+        elif facet in facets and count > 0 and not (facet == 'condition' and value is None):
+            facets[facet].append({"value": value, "count": count})
+    for facet, values in facets.items():
+        values.sort(key=lambda v: (-v["count"], v["value"] or ''))
+    facets['condition'] = facets['condition'][:top_conditions]
+    return total, facets
+
+def patients_page_response(total_count, limit, offset, patients, cache_status):
+    """Build the get_patients response body, noting how the search cache answered"""
+    response = jsonify({
+        "success": True,
+        "total": total_count,
+        "limit": limit,
+        "offset": offset,
+        "patients": patients
+    })
+    if cache_status:
+        response.headers['X-Search-Cache'] = cache_status
+    return response
+
+def build_patient_insert(data, now):
+    """Build the INSERT statement and parameters for a new patient"""
+    fields = []
+    placeholders = []
+    params = []
+
+    for field in PATIENT_FIELDS:
+        if field in data:
+            fields.append(field)
+            placeholders.append("%s")
+            params.append(data[field])
+
+    # Add timestamps
+    fields.extend(["created_at", "updated_at"])
+    placeholders.extend(["%s", "%s"])
+    params.extend([now, now])
+
+    query = f"""
+        INSERT INTO patients ({', '.join(fields)})
+        VALUES ({', '.join(placeholders)})
+        RETURNING patient_id
+    """
+    return query, params
+
+def build_patient_update(patient_id, data, now):
+    """Build the UPDATE statement and parameters for the provided fields"""
+    update_fields = ["updated_at = %s"]
+    params = [now]
+
+    for field in PATIENT_FIELDS:
+        if field in data and data[field] is not None:
+            update_fields.append(f"{field} = %s")
+            params.append(data[field])
+
+    params.append(patient_id)
+    query = f"""
+        UPDATE patients 
+        SET {", ".join(update_fields)}
+        WHERE patient_id = %s
+        RETURNING patient_id
+    """
+    return query, params
+
+@traced('db.connect')
 def get_db_connection():
     """Connect to the PostgreSQL database server"""
     try:
@@ -31,20 +364,36 @@ def get_db_connection():
             port=DB_CONFIG['port'],
             database=DB_CONFIG['database'],
             user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
+            password=DB_CONFIG['password'],
+            cursor_factory=TracingCursor
         )
         return conn
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Error connecting to database: {error}")
+        logger.error(f"Error connecting to database: {error}")
         return None
 
+# Patient name autocomplete, loaded in the background and kept current by
+# the patients_notify_change trigger
+autocomplete = AutocompleteService(get_db_connection)
+
 @app.route('/api/patients', methods=['GET'])
+@coalesce
 def get_patients():
     """API endpoint to retrieve patient data"""
     # Get query parameters
-    search = request.args.get('search', '')
+    search = normalize_search(request.args.get('search', ''))
     limit = int(request.args.get('limit', 10))
     offset = int(request.args.get('offset', 0))
+    fuzzy = request.args.get('mode') == 'fuzzy'
+
+    # Type-ahead searches are usually answered from the cache without a connection
+    cacheable = search and not fuzzy and not any(c in search for c in '%_\\')
+    if cacheable:
+        cached = search_cache.lookup(search, limit, offset)
+        if cached:
+            total_count, patients, source = cached
+            return patients_page_response(total_count, limit, offset, patients, source)
+        generation = search_cache.generation
     
     # Connect to database
     conn = get_db_connection()
@@ -54,6 +403,10 @@ def get_patients():
     cursor = conn.cursor()
     
     try:
+        if search and fuzzy:
+            total_count, patients = fuzzy_patient_search(cursor, search, limit, offset)
+            return patients_page_response(total_count, limit, offset, patients, None)
+
         # Get total count for pagination
         if search:
             cursor.execute(
@@ -71,24 +424,15 @@ def get_patients():
             cursor.execute("SELECT COUNT(*) FROM patients")
         
         total_count = cursor.fetchone()[0]
+
+        # Small result sets are fetched whole so longer terms can be refined in memory
+        fetch_all = cacheable and total_count <= search_cache.refine_max_rows
         
         # Fetch patients with pagination and search
         if search:
             cursor.execute(
-                """
-                SELECT 
-                    p.patient_id, 
-                    p.first_name, 
-                    p.last_name, 
-                    p.date_of_birth, 
-                    p.gender,
-                    p.contact_number,
-                    p.email,
-                    p.blood_type,
-                    p.rank,
-                    p.service,
-                    p.allergies,
-                    p.medical_conditions
+                f"""
+                SELECT {PATIENT_LIST_COLUMNS}
                 FROM patients p
                 WHERE 
                     p.first_name ILIKE %s OR 
@@ -97,24 +441,13 @@ def get_patients():
                 ORDER BY p.last_name, p.first_name
                 LIMIT %s OFFSET %s
                 """,
-                (f'%{search}%', f'%{search}%', f'%{search}%', limit, offset)
+                (f'%{search}%', f'%{search}%', f'%{search}%',
+                 total_count if fetch_all else limit, 0 if fetch_all else offset)
             )
         else:
             cursor.execute(
-                """
-                SELECT 
-                    p.patient_id, 
-                    p.first_name, 
-                    p.last_name, 
-                    p.date_of_birth, 
-                    p.gender,
-                    p.contact_number,
-                    p.email,
-                    p.blood_type,
-                    p.rank,
-                    p.service,
-                    p.allergies,
-                    p.medical_conditions
+                f"""
+                SELECT {PATIENT_LIST_COLUMNS}
                 FROM patients p
                 ORDER BY p.last_name, p.first_name
                 LIMIT %s OFFSET %s
@@ -124,27 +457,178 @@ def get_patients():
         
         # Convert query result to list of dictionaries
         column_names = [desc[0] for desc in cursor.description]
-        patients = []
+        patients = serialize_patient_rows(column_names, cursor.fetchall())
+
+        if fetch_all:
+            search_cache.store_matches(search, patients, generation)
+            patients = patients[offset:offset + limit]
+        elif cacheable:
+            search_cache.store_page(search, limit, offset, total_count, patients, generation)
         
-        for row in cursor.fetchall():
-            patient = dict(zip(column_names, row))
-            
-            # Convert date objects to string
-            if isinstance(patient['date_of_birth'], (datetime.date, datetime.datetime)):
-                patient['date_of_birth'] = patient['date_of_birth'].isoformat()
-            
-            patients.append(patient)
+        return patients_page_response(total_count, limit, offset, patients, 'miss' if cacheable else None)
         
+    except Exception as e:
+        logger.exception("Error fetching patients")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/patients/autocomplete', methods=['GET'])
+def autocomplete_patients():
+    """Suggest patients whose first or last name starts with ``q``"""
+    prefix = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_AUTOCOMPLETE_RESULTS)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+    if not normalize_name(prefix):
+        return jsonify({"success": True, "suggestions": []})
+
+    autocomplete.ensure_started()
+    suggestions = autocomplete.suggest(prefix, limit)
+    if suggestions is not None:
+        return jsonify({
+            "success": True,
+            "suggestions": [{"patient_id": pid, "name": name} for pid, name in suggestions]
+        })
+
+    # The in-memory index is still loading; answer from the trigram-indexed names
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+
+    try:
+        pattern = prefix.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        cursor.execute(
+            """
+            SELECT patient_id, last_name || ', ' || first_name
+            FROM patients
+            WHERE last_name ILIKE %s OR first_name ILIKE %s
+               OR (last_name || ' ' || first_name) ILIKE %s
+               OR (first_name || ' ' || last_name) ILIKE %s
+            ORDER BY last_name, first_name, patient_id
+            LIMIT %s
+            """,
+            (pattern, pattern, pattern, pattern, limit)
+        )
         return jsonify({
             "success": True,
+            "suggestions": [{"patient_id": pid, "name": name} for pid, name in cursor.fetchall()]
+        })
+
+    except Exception as e:
+        logger.exception("Error fetching autocomplete suggestions")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/patients/cohort', methods=['GET'])
+@coalesce
+def get_patient_cohort():
+    """API endpoint to list patients matching clinical and service filters
+
+    ``service``, ``rank``, ``blood_type`` and ``gender`` match any of their
+    comma-separated values exactly, case included; ``condition`` and
+    ``allergy`` require all of them, ignoring case, e.g.
+    ``?service=Navy&condition=Type 2 Diabetes&allergy=Penicillin``.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be at least 1 and offset not negative")
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+    where_sql, params, filters = build_cohort_filter(request.args)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM patients p WHERE {where_sql}", params)
+        total_count = cursor.fetchone()[0]
+
+        cursor.execute(
+            f"""
+            SELECT {PATIENT_LIST_COLUMNS}
+            FROM patients p
+            WHERE {where_sql}
+            ORDER BY p.last_name, p.first_name, p.patient_id
+            LIMIT %s OFFSET %s
+            """,
+            params + [limit, offset]
+        )
+        column_names = [desc[0] for desc in cursor.description]
+        patients = serialize_patient_rows(column_names, cursor.fetchall())
+
+        return jsonify({
+            "success": True,
+            "filters": filters,
             "total": total_count,
             "limit": limit,
             "offset": offset,
             "patients": patients
         })
-        
+
+    except Exception as e:
+        logger.exception("Error fetching patient cohort")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/patients/facets', methods=['GET'])
+@coalesce
+def get_patient_facets():
+    """API endpoint to count patients per blood type, service, rank, gender and condition
+
+    Takes the same filters as ``/api/patients/cohort``. Without filters the
+    counts come from the trigger-maintained ``patient_facet_counts`` table;
+    with filters all facets are counted in a single GROUPING SETS pass.
+    """
+    try:
+        top_conditions = min(int(request.args.get('top', FACET_TOP_CONDITIONS)), MAX_PAGE_SIZE)
+        if top_conditions < 0:
+            raise ValueError("top must not be negative")
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+    where_sql, params, filters = build_cohort_filter(request.args)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+
+    try:
+        if filters:
+            cursor.execute(FACET_QUERY.format(where=where_sql), params)
+            rows = [(FACET_GROUPINGS[grouping], value, count) for grouping, value, count in cursor.fetchall()]
+        else:
+            cursor.execute("SELECT facet, NULLIF(value, ''), count FROM patient_facet_counts WHERE count > 0")
+            rows = cursor.fetchall()
+        total_count, facets = build_facets(rows, top_conditions)
+
+        response = jsonify({
+            "success": True,
+            "filters": filters,
+            "total": total_count,
+            "facets": facets
+        })
+        response.headers['X-Facet-Source'] = 'query' if filters else 'table'
+        return response
+
     except Exception as e:
-        print(f"Error fetching patients: {e}")
+        logger.exception("Error counting patient facets")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
@@ -209,13 +693,129 @@ def get_patient(patient_id):
         })
         
     except Exception as e:
-        print(f"Error fetching patient: {e}")
+        logger.exception("Error fetching patient")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+def encode_cursor(*values):
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime.datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor, *kinds):
+    """Decode a cursor produced by encode_cursor into its list of values.
+
+    ``kinds`` gives the expected type of each value (datetime, str or int);
+    a cursor of any other shape raises ValueError.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise ValueError
+        decoded = []
+        for value, kind in zip(values, kinds):
+            if kind is datetime.datetime:
+                value = datetime.datetime.fromisoformat(value)
+            elif not isinstance(value, kind) or isinstance(value, bool):
+                raise ValueError
+            decoded.append(value)
+        return decoded
+    except Exception:
+        raise ValueError(f"malformed cursor '{cursor}'")
+
+@app.route('/api/patients/<int:patient_id>/records', methods=['GET'])
+def get_patient_records(patient_id):
+    """API endpoint to retrieve a patient's merged medical records timeline
+
+    Visits, medications, appointments and notes are merged newest first in
+    a single UNION ALL query. Each branch is limited to one page on its own
+    index before merging. Pass ``before`` (the previous ``next_cursor``) to
+    page further back and ``types`` to restrict the sources.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        types = request.args.get('types')
+        sources = [t.strip() for t in types.split(',')] if types else list(TIMELINE_SOURCES)
+        unknown = [t for t in sources if t not in TIMELINE_SOURCES]
+        if unknown:
+            raise ValueError(f"unknown record types: {', '.join(unknown)}")
+        before = request.args.get('before')
+        position = decode_cursor(before, datetime.datetime, str, int) if before else None
+        if position and position[1] not in TIMELINE_SOURCES:
+            raise ValueError(f"malformed cursor '{before}'")
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+
+    branches = []
+    params = []
+    for source in sources:
+        spec = TIMELINE_SOURCES[source]
+        cursor_sql = ""
+        branch_params = [patient_id]
+        if position:
+            # The plain timestamp bound keeps the branch on its index; the
+            # row comparison breaks ties on (source, id)
+            ts = spec['timestamp']
+            id_column = ts.split('.')[0] + '.id'
+            cursor_sql = f"AND {ts} <= %s AND ({ts}, '{source}'::text, {id_column}) < (%s, %s, %s)"
+            branch_params.extend([position[0]] + position)
+        branch_params.append(limit + 1)
+        branches.append(f"({spec['query'].format(cursor=cursor_sql)})")
+        params.extend(branch_params)
+
+    query = f"""
+        SELECT source, id, occurred_at, description
+        FROM ({' UNION ALL '.join(branches)}) AS timeline
+        ORDER BY occurred_at DESC, source DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        records = []
+        for source, record_id, occurred_at, description in rows:
+            records.append({
+                "record_id": f"{source}-{record_id}",
+                "type": source,
+                "date": occurred_at.isoformat() if occurred_at else None,
+                "description": description
+            })
+
+        next_cursor = None
+        if has_more:
+            source, record_id, occurred_at, _ = rows[-1]
+            next_cursor = encode_cursor(occurred_at, source, record_id)
+
+        return jsonify({
+            "success": True,
+            "records": records,
+            "next_cursor": next_cursor
+        })
+
+    except Exception as e:
+        logger.exception("Error fetching patient records")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
         conn.close()
 
 @app.route('/api/dashboard-stats', methods=['GET'])
+@coalesce
 def get_dashboard_stats():
     """API endpoint to retrieve dashboard statistics"""
     # Connect to database
@@ -239,8 +839,16 @@ def get_dashboard_stats():
         # Pending records (5% of total)
         pending_records = int(total_patients * 0.05)
         
-        # Today's appointments (simulated)
-        appointments_today = min(12, int(total_patients * 0.1))
+        # Today's appointments from the per-day rollup maintained by a
+        # trigger on the appointments table
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(count), 0)
+            FROM appointment_daily_counts
+            WHERE day = CURRENT_DATE AND status <> 'Cancelled'
+            """
+        )
+        appointments_today = int(cursor.fetchone()[0])
         
         return jsonify({
             "success": True,
@@ -253,7 +861,7 @@ def get_dashboard_stats():
         })
         
     except Exception as e:
-        print(f"Error fetching dashboard stats: {e}")
+        logger.exception("Error fetching dashboard stats")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
@@ -266,6 +874,11 @@ def add_patient():
 
     if not data:
         return jsonify({"success": False, "message": "No data provided"}), 400
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Request body must be a JSON object"}), 400
+    not_text = [field for field in PATIENT_FIELDS if data.get(field) is not None and not isinstance(data[field], str)]
+    if not_text:
+        return jsonify({"success": False, "message": f"Fields must be strings: {', '.join(not_text)}"}), 400
 
     conn = get_db_connection()
     if not conn:
@@ -274,59 +887,47 @@ def add_patient():
     cursor = conn.cursor()
 
     try:
-        allowed_fields = [
-            "first_name",
-            "last_name",
-            "date_of_birth",
-            "gender",
-            "contact_number",
-            "email",
-            "address",
-            "emergency_contact",
-            "emergency_contact_number",
-            "blood_type",
-            "rank",
-            "service",
-            "fmpc",
-            "allergies",
-            "medical_conditions"
-        ]
+        # Master patient index check: compare against patients sharing a
+        # blocking key (DOB + phonetic last name, email or phone)
+        duplicates = mpi.find_duplicates(cursor, data)
+        if not data.get('allow_duplicate') and any(d['score'] >= mpi.MPI_MATCH_THRESHOLD for d in duplicates):
+            conn.rollback()
+            return jsonify({
+                "success": False,
+                "message": "This patient appears to already exist. Resubmit with allow_duplicate set to add them anyway.",
+                "possible_duplicates": duplicates
+            }), 409
 
-        fields = []
-        placeholders = []
-        params = []
-
-        for field in allowed_fields:
-            if field in data:
-                fields.append(field)
-                placeholders.append("%s")
-                params.append(data[field])
-
-        # Add timestamps
-        fields.extend(["created_at", "updated_at"])
-        placeholders.extend(["%s", "%s"])
-        now = datetime.datetime.now()
-        params.extend([now, now])
-
-        query = f"""
-            INSERT INTO patients ({', '.join(fields)})
-            VALUES ({', '.join(placeholders)})
-            RETURNING patient_id
-        """
+        query, params = build_patient_insert(data, datetime.datetime.now())
 
         cursor.execute(query, params)
         new_id = cursor.fetchone()[0]
+
+        # Keep near matches for review alongside the batch job's findings
+        if duplicates:
+            psycopg2.extras.execute_values(
+                cursor,
+                """
+                INSERT INTO patient_duplicate_candidates (patient_id, duplicate_of, score, reasons)
+                VALUES %s
+                ON CONFLICT (patient_id, duplicate_of) DO NOTHING
+                """,
+                [(new_id, d['patient_id'], d['score'], d['reasons']) for d in duplicates]
+            )
+
         conn.commit()
+        search_cache.invalidate()
 
         return jsonify({
             "success": True,
             "message": "Patient added successfully",
-            "patient_id": new_id
+            "patient_id": new_id,
+            "possible_duplicates": duplicates
         })
 
     except Exception as e:
         conn.rollback()
-        print(f"Error adding patient: {e}")
+        logger.exception("Error adding patient")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
@@ -363,7 +964,235 @@ def add_patient_note(patient_id):
         return jsonify({"success": True, "note_id": note_id})
     except Exception as e:
         conn.rollback()
-        print(f"Error adding note: {e}")
+        logger.exception("Error adding note")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/patients/<int:patient_id>/notes', methods=['GET'])
+def get_patient_notes(patient_id):
+    """Retrieve a patient's clinical notes, newest first
+
+    Pages seek on (created_at, id) using the ``before`` cursor returned as
+    ``next_cursor``, so deep pages cost the same as the first one.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        before = request.args.get('before')
+        position = decode_cursor(before, datetime.datetime, int) if before else None
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        cursor_sql = ""
+        params = [patient_id]
+        if position:
+            cursor_sql = "AND (created_at, id) < (%s, %s)"
+            params.extend(position)
+        params.append(limit + 1)
+
+        cursor.execute(
+            f"""
+            SELECT id, note, created_at
+            FROM patient_notes
+            WHERE patient_id = %s {cursor_sql}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+            """,
+            params
+        )
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        notes = [
+            {"note_id": note_id, "note": note, "created_at": created_at.isoformat()}
+            for note_id, note, created_at in rows
+        ]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0]) if has_more else None
+
+        return jsonify({"success": True, "notes": notes, "next_cursor": next_cursor})
+    except Exception as e:
+        logger.exception("Error fetching notes")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/notes/batch', methods=['POST'])
+def add_patient_notes_batch():
+    """Add many clinical notes, possibly for different patients, at once
+
+    Expects ``{"notes": [{"patient_id", "note", "created_at"?}, ...]}``.
+    Patient ids are validated with one query and every valid note is
+    inserted with a single unnest() INSERT in one transaction. The
+    response lists a result per item in request order.
+    """
+    data = request.get_json()
+    items = data.get('notes') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"success": False, "message": "A non-empty 'notes' list is required"}), 400
+    if len(items) > MAX_NOTE_BATCH:
+        return jsonify({"success": False, "message": f"At most {MAX_NOTE_BATCH} notes per batch"}), 400
+
+    results = [None] * len(items)
+    candidates = []
+    for index, item in enumerate(items):
+        try:
+            patient_id = int(item['patient_id'])
+            note = item['note']
+            if not isinstance(note, str) or not note.strip():
+                raise ValueError("note is required")
+            created_at = item.get('created_at')
+            created_at = datetime.datetime.fromisoformat(created_at) if created_at else None
+        except (KeyError, TypeError, ValueError) as e:
+            results[index] = {"index": index, "success": False, "message": f"Invalid note: {e}"}
+            continue
+        candidates.append((index, patient_id, note, created_at))
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        patient_ids = list({c[1] for c in candidates})
+        cursor.execute(
+            "SELECT patient_id FROM patients WHERE patient_id = ANY(%s)",
+            (patient_ids,)
+        )
+        known = {row[0] for row in cursor.fetchall()}
+
+        valid = []
+        for index, patient_id, note, created_at in candidates:
+            if patient_id in known:
+                valid.append((index, patient_id, note, created_at))
+            else:
+                results[index] = {"index": index, "success": False, "message": "Patient not found"}
+
+        if valid:
+            # RETURNING order is not guaranteed, so ids are drawn per input
+            # position (ordinality) first and mapped back by that position
+            cursor.execute(
+                """
+                WITH n AS (
+                    SELECT nextval(pg_get_serial_sequence('patient_notes', 'id')) AS id,
+                           ord, patient_id, note, created_at
+                    FROM unnest(%s::int[], %s::text[], %s::timestamp[])
+                         WITH ORDINALITY AS n(patient_id, note, created_at, ord)
+                ), inserted AS (
+                    INSERT INTO patient_notes (id, patient_id, note, created_at)
+                    SELECT id, patient_id, note, COALESCE(created_at, NOW())
+                    FROM n
+                    RETURNING id
+                )
+                SELECT n.ord, n.id
+                FROM n JOIN inserted USING (id)
+                """,
+                (
+                    [v[1] for v in valid],
+                    [v[2] for v in valid],
+                    [v[3] for v in valid]
+                )
+            )
+            for ord, note_id in cursor.fetchall():
+                index = valid[ord - 1][0]
+                results[index] = {"index": index, "success": True, "note_id": note_id}
+        conn.commit()
+
+        return jsonify({
+            "success": True,
+            "inserted": len(valid),
+            "failed": len(items) - len(valid),
+            "results": results
+        })
+    except Exception as e:
+        conn.rollback()
+        logger.exception("Error adding notes batch")
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/notes/search', methods=['GET'])
+def search_notes():
+    """Full-text search across clinical notes, best matches first
+
+    ``q`` accepts web-search syntax (quoted phrases, ``or``, ``-word``).
+    Matching runs on the GIN-indexed ``note_tsv`` column; snippets are only
+    built for the page being returned. ``patient_id`` narrows the search.
+    """
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify({"success": False, "message": "Search query is required"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), MAX_PAGE_SIZE)
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be at least 1 and offset not negative")
+        patient_filter = request.args.get('patient_id')
+        patient_filter = int(patient_filter) if patient_filter else None
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "message": "Database connection failed"}), 500
+
+    cursor = conn.cursor()
+    try:
+        patient_sql = ""
+        params = [query_text]
+        if patient_filter is not None:
+            patient_sql = "AND n.patient_id = %s"
+            params.append(patient_filter)
+        params.extend([limit, offset])
+
+        cursor.execute(
+            f"""
+            WITH query AS (SELECT websearch_to_tsquery('english', %s) AS tsq),
+            ranked AS (
+                SELECT n.id, n.patient_id, n.note, n.created_at,
+                       ts_rank_cd(n.note_tsv, query.tsq) AS rank, query.tsq
+                FROM patient_notes n, query
+                WHERE n.note_tsv @@ query.tsq {patient_sql}
+                ORDER BY rank DESC, n.created_at DESC
+                LIMIT %s OFFSET %s
+            )
+            SELECT id, patient_id, created_at, rank,
+                   ts_headline('english', note, tsq, 'MaxFragments=2, MaxWords=20, MinWords=5') AS snippet
+            FROM ranked
+            ORDER BY rank DESC, created_at DESC
+            """,
+            params
+        )
+
+        results = [
+            {
+                "note_id": note_id,
+                "patient_id": note_patient_id,
+                "created_at": created_at.isoformat(),
+                "rank": float(rank),
+                "snippet": snippet
+            }
+            for note_id, note_patient_id, created_at, rank, snippet in cursor.fetchall()
+        ]
+        return jsonify({
+            "success": True,
+            "limit": limit,
+            "offset": offset,
+            "results": results
+        })
+    except Exception as e:
+        logger.exception("Error searching notes")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
@@ -394,73 +1223,33 @@ def update_patient(patient_id):
             return jsonify({"success": False, "message": "Patient not found"}), 404
         
         # Build update query and parameter list dynamically based on provided fields
-        update_fields = []
-        params = []
-        
-        # Define fields that can be updated
-        allowed_fields = [
-            "first_name", 
-            "last_name", 
-            "date_of_birth", 
-            "gender", 
-            "contact_number", 
-            "email", 
-            "address", 
-            "emergency_contact", 
-            "emergency_contact_number",
-            "blood_type", 
-            "rank", 
-            "service", 
-            "fmpc", 
-            "allergies", 
-            "medical_conditions"
-        ]
+        query, params = build_patient_update(patient_id, data, datetime.datetime.now())
         
-        # Add updated_at timestamp
-        update_fields.append("updated_at = %s")
-        params.append(datetime.datetime.now())
+        cursor.execute(query, params)
+        updated_id = cursor.fetchone()[0]
         
-        # Add fields from request
-        for field in allowed_fields:
-            if field in data and data[field] is not None:
-                update_fields.append(f"{field} = %s")
-                params.append(data[field])
+        # Commit the transaction
+        conn.commit()
+        search_cache.invalidate()
         
-        # Only proceed if there are fields to update
-        if update_fields:
-            # Add patient_id to params
-            params.append(patient_id)
-            
-            # Construct and execute update query
-            query = f"""
-                UPDATE patients 
-                SET {", ".join(update_fields)}
-                WHERE patient_id = %s
-                RETURNING patient_id
-            """
-            
-            cursor.execute(query, params)
-            updated_id = cursor.fetchone()[0]
-            
-            # Commit the transaction
-            conn.commit()
-            
-            return jsonify({
-                "success": True,
-                "message": "Patient updated successfully",
-                "patient_id": updated_id
-            })
-        else:
-            return jsonify({"success": False, "message": "No valid fields to update"}), 400
+        return jsonify({
+            "success": True,
+            "message": "Patient updated successfully",
+            "patient_id": updated_id
+        })
         
     except Exception as e:
         # Roll back in case of error
         conn.rollback()
-        print(f"Error updating patient: {e}")
+        logger.exception("Error updating patient")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
     finally:
         cursor.close()
         conn.close()
 
 if __name__ == "__main__":
+    # Start loading the autocomplete index before the first request needs it,
+    # in the reloader's child only; its parent never serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        autocomplete.ensure_started()
     app.run(host='0.0.0.0', port=8002, debug=True) 
\ No newline at end of file
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+from flask import g, request, has_request_context
+
+# Attributes every LogRecord has; anything else was passed with extra=
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'service': self.service,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records from request threads; formatting and I/O happen on the listener.
+
+    Only the cheap work stays on the request thread: merging the message
+    arguments, rendering a traceback if there is one, and attaching the
+    request context. A full queue drops the record instead of blocking.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if has_request_context():
+            if 'request_id' not in vars(record):
+                record.request_id = g.get('request_id')
+            if 'route' not in vars(record):
+                record.route = request.url_rule.rule if request.url_rule else request.path
+                record.method = request.method
+            trace = g.get('trace_root')
+            if trace is not None and 'trace_id' not in vars(record):
+                record.trace_id = trace.trace_id
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def is_werkzeug_access_log(record):
+    """True for the per-request line the development server writes itself."""
+    return isinstance(record.msg, str) and record.msg.endswith('"%s" %s %s')
+
+def init_logging(app, service):
+    """Route all logging for a Flask app through a queue as JSON lines.
+
+    Adds an X-Request-ID to every request (reusing the caller's), and writes
+    one access record per request with route, status and latency. Errors,
+    4xx/5xx responses and slow requests are always logged; other successful
+    requests are sampled at LOG_SUCCESS_SAMPLE_RATE.
+    """
+    # Read here rather than at import so values the APIs load from .env are seen
+    level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # Optional file that receives the JSON lines in addition to stdout
+    log_file = os.getenv('LOG_FILE', '')
+    # Fraction of successful (< 400), fast requests that get an access log line
+    success_sample_rate = float(os.getenv('LOG_SUCCESS_SAMPLE_RATE', '0.1'))
+    # Requests slower than this are always logged
+    slow_ms = float(os.getenv('LOG_SLOW_MS', '1000'))
+    queue_size = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    formatter = JSONFormatter(service)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.WatchedFileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+
+    queue_handler = RequestQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    werkzeug_logger = logging.getLogger('werkzeug')
+    werkzeug_logger.handlers = []
+    werkzeug_logger.propagate = True
+    werkzeug_logger.addFilter(lambda record: not is_werkzeug_access_log(record))
+    app.logger.handlers = []
+    app.logger.propagate = True
+
+    access_logger = logging.getLogger(f"{service}.access")
+
+    @app.before_request
+    def start_request_log():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def write_access_log(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        latency_ms = (time.perf_counter() - started) * 1000
+        response.headers['X-Request-ID'] = g.request_id
+        status = response.status_code
+        if status < 400 and latency_ms < slow_ms:
+            if random.random() >= success_sample_rate:
+                return response
+            sample_rate = success_sample_rate
+        else:
+            sample_rate = 1.0
+        access_logger.log(logging.WARNING if status >= 500 else logging.INFO,
+                          f"{request.method} {request.path} {status}", extra={
+                              'status': status,
+                              'latency_ms': round(latency_ms, 2),
+                              'sample_rate': sample_rate
+                          })
+        return response
+
+    return queue_handler
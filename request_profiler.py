@@ -0,0 +1,126 @@
+import os
+import hmac
+import re
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from flask import g, request
+
+def profiling_settings():
+    """Read the profiler settings from the environment.
+
+    Called from init_profiling rather than at import, so values the APIs
+    load from .env afterwards are seen.
+    """
+    return {
+        # Shared secret that lets an admin profile a single request by sending
+        # it in the X-Profile-Token header. Header-triggered profiling is off when unset.
+        'token': os.getenv('PROFILE_TOKEN', ''),
+        # Fraction of all requests profiled without the header (0 disables sampling)
+        'sample_rate': float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+        # How often the request thread's stack is sampled
+        'interval_ms': float(os.getenv('PROFILE_INTERVAL_MS', '1')),
+        # Where collapsed stacks are written, and how many files are kept
+        'directory': os.getenv('PROFILE_DIR', 'profiles'),
+        'max_files': int(os.getenv('PROFILE_MAX_FILES', '200'))
+    }
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread.
+
+    Stacks are counted in collapsed form (``frame;frame;frame``), which is
+    what flamegraph.pl, speedscope and inferno take as input. Sampling
+    keeps the overhead on the profiled request low and independent of how
+    many function calls the request makes.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def should_profile(settings):
+    """Decide whether to profile the current request."""
+    token = request.headers.get('X-Profile-Token')
+    if token and settings['token'] and hmac.compare_digest(token.encode(), settings['token'].encode()):
+        return True
+    return settings['sample_rate'] > 0 and random.random() < settings['sample_rate']
+
+def prune_profiles(directory, max_files):
+    """Delete the oldest profiles so at most ``max_files`` remain."""
+    files = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.folded')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in files[:max(0, len(files) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def init_profiling(app, service):
+    """Register the opt-in request profiler on a Flask app.
+
+    A request is profiled when it carries the admin X-Profile-Token header
+    or is picked by PROFILE_SAMPLE_RATE. Its collapsed stacks are written to
+    PROFILE_DIR and the file name is returned in the X-Profile-Id header.
+    """
+    settings = profiling_settings()
+    if not settings['token'] and settings['sample_rate'] <= 0:
+        return
+
+    os.makedirs(settings['directory'], exist_ok=True)
+    write_lock = threading.Lock()
+
+    @app.before_request
+    def start_profile():
+        if should_profile(settings):
+            g.profiler = StackSampler(threading.get_ident(), settings['interval_ms'] / 1000)
+            g.profile_started = time.perf_counter()
+            g.profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+
+        route = request.url_rule.rule if request.url_rule else request.path
+        route = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{service}-{request.method}-{route}-{elapsed_ms:.0f}ms-{os.getpid()}-{threading.get_ident()}.folded"
+        with write_lock:
+            with open(os.path.join(settings['directory'], name), 'w') as f:
+                f.write(profiler.collapsed())
+            prune_profiles(settings['directory'], settings['max_files'])
+        response.headers['X-Profile-Id'] = name
+        return response
@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import OrderedDict
+
+class SearchCache:
+    """Bounded LRU cache of search results with in-memory prefix refinement.
+
+    Two kinds of entries are kept per normalized term:
+
+    * the complete, ordered match list when a term has at most
+      ``refine_max_rows`` matches, and
+    * single result pages for terms with more matches than that.
+
+    A term with no entry of its own is answered from the complete match list
+    of its longest cached prefix, filtered with ``matches(row, term)``. That
+    works for substring searches: anything containing "smith" also contains
+    "smit". Entries expire after ``ttl`` seconds, and ``invalidate`` drops
+    everything when the underlying rows change.
+    """
+
+    def __init__(self, matches, max_rows=20000, refine_max_rows=200, ttl=60):
+        self.matches = matches
+        self.max_rows = max_rows
+        self.refine_max_rows = refine_max_rows
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, term, limit, offset):
+        """Return (total, rows, source) with source 'hit' or 'refine', or None on a miss."""
+        with self.lock:
+            page = self._get(('page', term, limit, offset))
+            if page is not None:
+                return page[0], page[1], 'hit'
+            full = self._get(('all', term))
+            if full is not None:
+                return len(full), full[offset:offset + limit], 'hit'
+            for end in range(len(term) - 1, 0, -1):
+                candidates = self._get(('all', term[:end]))
+                if candidates is not None:
+                    break
+            else:
+                return None
+            generation = self.generation
+
+        refined = [row for row in candidates if self.matches(row, term)]
+        self.store_matches(term, refined, generation)
+        return len(refined), refined[offset:offset + limit], 'refine'
+
+    def store_matches(self, term, rows, generation):
+        """Cache the complete ordered match list for ``term``."""
+        self._put(('all', term), rows, len(rows), generation)
+
+    def store_page(self, term, limit, offset, total, rows, generation):
+        """Cache one page of results for a term with too many matches to keep whole."""
+        self._put(('page', term, limit, offset), (total, rows), len(rows), generation)
+
+    def invalidate(self):
+        """Drop every entry, and any result computed before this call."""
+        with self.lock:
+            self.entries.clear()
+            self.rows = 0
+            self.generation += 1
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, size, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            self.rows -= size
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value, size, generation):
+        with self.lock:
+            # A write happened while this result was being computed
+            if generation != self.generation:
+                return
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.rows -= old[1]
+            self.entries[key] = (time.monotonic(), size, value)
+            self.rows += size
+            while self.rows > self.max_rows and len(self.entries) > 1:
+                _, (_, evicted, _) = self.entries.popitem(last=False)
+                self.rows -= evicted
@@ -1,8 +1,10 @@
 import os
+import re
 import sys
+import argparse
 import psycopg2
 from psycopg2 import sql
-from datetime import datetime
+from datetime import datetime, date
 from dotenv import load_dotenv
 import hashlib
 
@@ -19,6 +21,46 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'postgres')
 }
 
+# Monthly range-partitioned tables and how many months of data to keep
+# (0 keeps everything). Partitions are named <table>_YYYY_MM.
+PARTITIONED_TABLES = {
+    'login_history': {
+        'column': 'timestamp',
+        'retention_months': int(os.getenv('LOGIN_HISTORY_RETENTION_MONTHS', '12'))
+    },
+    'appointments': {
+        'column': 'appointment_time',
+        'retention_months': int(os.getenv('APPOINTMENTS_RETENTION_MONTHS', '0'))
+    }
+}
+
+LOGIN_HISTORY_PARTITIONED = """
+        CREATE TABLE IF NOT EXISTS login_history (
+            id SERIAL,
+            user_id INTEGER REFERENCES users(id),
+            timestamp TIMESTAMP NOT NULL,
+            "ipAddress" VARCHAR(45) NOT NULL,
+            success BOOLEAN NOT NULL,
+            user_agent VARCHAR(255),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+
+APPOINTMENTS_PARTITIONED = """
+        CREATE TABLE IF NOT EXISTS appointments (
+            id SERIAL,
+            patient_id INTEGER REFERENCES patients(patient_id),
+            provider_id INTEGER REFERENCES users(id),
+            appointment_time TIMESTAMP NOT NULL,
+            duration_minutes INTEGER NOT NULL DEFAULT 30 CHECK (duration_minutes > 0),
+            reason TEXT,
+            status VARCHAR(20) NOT NULL DEFAULT 'Scheduled',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, appointment_time)
+        ) PARTITION BY RANGE (appointment_time)
+        """
+
 def get_db_connection():
     """Connect to the PostgreSQL database server"""
     conn = None
@@ -60,125 +102,933 @@ def get_db_connection():
             conn.close()
         sys.exit(1)
 
-def create_tables(conn):
-    """Create necessary tables for the EHR system"""
-    commands = [
+def build_migrations(partitioned=False):
+    """Return the ordered list of schema migrations as (version, name, statements)
+
+    Every statement is idempotent so the first run against a database set
+    up by an earlier version of this script converges on the same schema.
+    With ``partitioned`` set, new login_history and appointments tables are
+    created range-partitioned by month; existing tables are left as they are.
+    """
+    return [
+        (1, "core tables", [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username VARCHAR(50) UNIQUE NOT NULL,
+                email VARCHAR(100) UNIQUE,
+                full_name VARCHAR(100),
+                hashed_password VARCHAR(255) NOT NULL,
+                role VARCHAR(20) NOT NULL DEFAULT 'user',
+                is_active BOOLEAN NOT NULL DEFAULT TRUE,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP,
+                last_login TIMESTAMP
+            )
+            """,
+            # The login API and data scripts create users without a full
+            # name or email and stamp updated_at
+            "ALTER TABLE users ALTER COLUMN email DROP NOT NULL",
+            "ALTER TABLE users ALTER COLUMN full_name DROP NOT NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP",
+            LOGIN_HISTORY_PARTITIONED if partitioned else """
+            CREATE TABLE IF NOT EXISTS login_history (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                timestamp TIMESTAMP NOT NULL,
+                "ipAddress" VARCHAR(45) NOT NULL,
+                success BOOLEAN NOT NULL,
+                user_agent VARCHAR(255)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                session_token VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NOT NULL,
+                is_active BOOLEAN NOT NULL DEFAULT TRUE
+            )
+            """,
+            "CREATE TABLE IF NOT EXISTS ranks (id SERIAL PRIMARY KEY, name VARCHAR(20) UNIQUE NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS services (id SERIAL PRIMARY KEY, name VARCHAR(50) UNIQUE NOT NULL)",
+            "CREATE TABLE IF NOT EXISTS fmpcs (id SERIAL PRIMARY KEY, name VARCHAR(100) UNIQUE NOT NULL)",
+            """
+            CREATE TABLE IF NOT EXISTS patients (
+                patient_id SERIAL PRIMARY KEY,
+                medical_record_number VARCHAR(50) UNIQUE,
+                first_name VARCHAR(50) NOT NULL,
+                last_name VARCHAR(50) NOT NULL,
+                date_of_birth DATE NOT NULL,
+                gender VARCHAR(20),
+                contact_number VARCHAR(30),
+                email VARCHAR(100),
+                address VARCHAR(255),
+                emergency_contact VARCHAR(100),
+                emergency_contact_number VARCHAR(30),
+                blood_type VARCHAR(5),
+                rank VARCHAR(20),
+                service VARCHAR(50),
+                fmpc VARCHAR(20),
+                allergies TEXT,
+                medical_conditions TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            # Bring a patients table from the original schema in line with
+            # the columns patient_api.py reads and writes
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'patients' AND column_name = 'id'
+                ) AND NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'patients' AND column_name = 'patient_id'
+                ) THEN
+                    ALTER TABLE patients RENAME COLUMN id TO patient_id;
+                END IF;
+            END
+            $$
+            """,
+            "ALTER TABLE patients ALTER COLUMN medical_record_number DROP NOT NULL",
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS contact_number VARCHAR(30),
+                ADD COLUMN IF NOT EXISTS emergency_contact VARCHAR(100),
+                ADD COLUMN IF NOT EXISTS emergency_contact_number VARCHAR(30),
+                ADD COLUMN IF NOT EXISTS blood_type VARCHAR(5),
+                ADD COLUMN IF NOT EXISTS rank VARCHAR(20),
+                ADD COLUMN IF NOT EXISTS service VARCHAR(50),
+                ADD COLUMN IF NOT EXISTS fmpc VARCHAR(20),
+                ADD COLUMN IF NOT EXISTS allergies TEXT,
+                ADD COLUMN IF NOT EXISTS medical_conditions TEXT
+            """
+        ]),
+        (2, "clinical tables", [
+            """
+            CREATE TABLE IF NOT EXISTS visits (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER REFERENCES patients(patient_id),
+                visit_date TIMESTAMP NOT NULL,
+                visit_type VARCHAR(50) NOT NULL,
+                provider_id INTEGER REFERENCES users(id),
+                reason_for_visit TEXT,
+                diagnosis TEXT,
+                notes TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS medications (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER REFERENCES patients(patient_id),
+                medication_name VARCHAR(100) NOT NULL,
+                dosage VARCHAR(50) NOT NULL,
+                frequency VARCHAR(50) NOT NULL,
+                start_date DATE NOT NULL,
+                end_date DATE,
+                prescriber_id INTEGER REFERENCES users(id),
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            APPOINTMENTS_PARTITIONED if partitioned else """
+            CREATE TABLE IF NOT EXISTS appointments (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER REFERENCES patients(patient_id),
+                provider_id INTEGER REFERENCES users(id),
+                appointment_time TIMESTAMP NOT NULL,
+                duration_minutes INTEGER NOT NULL DEFAULT 30 CHECK (duration_minutes > 0),
+                reason TEXT,
+                status VARCHAR(20) NOT NULL DEFAULT 'Scheduled',
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS patient_notes (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER REFERENCES patients(patient_id),
+                note TEXT NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        ]),
+        # Scheduling: each appointment occupies [appointment_time, +duration)
+        # and a provider cannot hold two active bookings that overlap.
+        # Partitioned appointments get the constraint per partition instead
+        # (see create_partition).
+        (3, "appointment scheduling", [
+            """
+            ALTER TABLE appointments
+                ADD COLUMN IF NOT EXISTS duration_minutes INTEGER NOT NULL DEFAULT 30
+            """,
+            """
+            ALTER TABLE appointments
+                ADD COLUMN IF NOT EXISTS time_range TSRANGE
+                GENERATED ALWAYS AS (
+                    tsrange(appointment_time, appointment_time + duration_minutes * INTERVAL '1 minute')
+                ) STORED
+            """,
+            # Occurrences created together by the bulk/recurrence endpoint
+            "ALTER TABLE appointments ADD COLUMN IF NOT EXISTS series_id UUID",
+            "CREATE EXTENSION IF NOT EXISTS btree_gist",
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = 'appointments_no_provider_overlap'
+                ) AND (SELECT relkind FROM pg_class WHERE oid = 'appointments'::regclass) = 'r' THEN
+                    ALTER TABLE appointments
+                        ADD CONSTRAINT appointments_no_provider_overlap
+                        EXCLUDE USING gist (provider_id WITH =, time_range WITH &&)
+                        WHERE (status <> 'Cancelled');
+                END IF;
+            END
+            $$
+            """
+        ]),
+        # Per-day appointment counts by provider and status, kept current by
+        # a trigger so "today" views never scan the appointments table.
+        # provider_id 0 collects appointments without a provider.
+        (4, "appointment daily counts", [
+            """
+            CREATE TABLE IF NOT EXISTS appointment_daily_counts (
+                day DATE NOT NULL,
+                provider_id INTEGER NOT NULL DEFAULT 0,
+                status VARCHAR(20) NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, provider_id, status)
+            )
+            """,
+            """
+            CREATE OR REPLACE FUNCTION bump_appointment_daily_count(
+                p_day DATE, p_provider_id INTEGER, p_status VARCHAR, p_delta INTEGER
+            ) RETURNS VOID AS $$
+            BEGIN
+                INSERT INTO appointment_daily_counts (day, provider_id, status, count)
+                VALUES (p_day, COALESCE(p_provider_id, 0), p_status, p_delta)
+                ON CONFLICT (day, provider_id, status)
+                DO UPDATE SET count = appointment_daily_counts.count + EXCLUDED.count;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE FUNCTION maintain_appointment_daily_counts()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE'
+                   AND OLD.appointment_time::date = NEW.appointment_time::date
+                   AND OLD.provider_id IS NOT DISTINCT FROM NEW.provider_id
+                   AND OLD.status = NEW.status THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    PERFORM bump_appointment_daily_count(
+                        OLD.appointment_time::date, OLD.provider_id, OLD.status, -1);
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM bump_appointment_daily_count(
+                        NEW.appointment_time::date, NEW.provider_id, NEW.status, 1);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS appointments_daily_counts ON appointments",
+            """
+            CREATE TRIGGER appointments_daily_counts
+                AFTER INSERT OR UPDATE OR DELETE ON appointments
+                FOR EACH ROW EXECUTE FUNCTION maintain_appointment_daily_counts()
+            """,
+            # One-off backfill for databases that already hold appointments
+            """
+            INSERT INTO appointment_daily_counts (day, provider_id, status, count)
+            SELECT appointment_time::date, COALESCE(provider_id, 0), status, COUNT(*)
+            FROM appointments
+            WHERE NOT EXISTS (SELECT 1 FROM appointment_daily_counts)
+            GROUP BY 1, 2, 3
+            """
+        ]),
+        # Full-text search over clinical notes
+        (5, "patient notes full-text search", [
+            """
+            ALTER TABLE patient_notes
+                ADD COLUMN IF NOT EXISTS note_tsv TSVECTOR
+                GENERATED ALWAYS AS (to_tsvector('english', note)) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_patient_notes_tsv ON patient_notes USING gin (note_tsv)"
+        ]),
+        # Indexes for the shapes listed in QUERY_SHAPES
+        (6, "hot query indexes", [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS idx_patients_name ON patients (last_name, first_name)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_last_name_trgm
+                ON patients USING gin (last_name gin_trgm_ops)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_first_name_trgm
+                ON patients USING gin (first_name gin_trgm_ops)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_appointments_provider_time
+                ON appointments (provider_id, appointment_time)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_appointments_patient_time
+                ON appointments (patient_id, appointment_time)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_appointments_status_time
+                ON appointments (status, appointment_time)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_appointments_time_id
+                ON appointments (appointment_time DESC, id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_visits_patient_date
+                ON visits (patient_id, visit_date DESC, id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_medications_patient_start
+                ON medications (patient_id, start_date DESC, id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patient_notes_patient_created
+                ON patient_notes (patient_id, created_at DESC, id DESC)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_login_history_user_time
+                ON login_history (user_id, timestamp DESC)
+            """
+        ]),
+        # NOTIFY on patient name changes so in-process indexes (the patient
+        # API's autocomplete) stay current without polling
+        (7, "patient change notifications", [
+            """
+            CREATE OR REPLACE FUNCTION notify_patient_change()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    PERFORM pg_notify('patient_changes', json_build_object(
+                        'op', TG_OP, 'patient_id', OLD.patient_id)::text);
+                ELSE
+                    PERFORM pg_notify('patient_changes', json_build_object(
+                        'op', TG_OP, 'patient_id', NEW.patient_id,
+                        'first_name', NEW.first_name, 'last_name', NEW.last_name)::text);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS patients_notify_change ON patients",
+            """
+            CREATE TRIGGER patients_notify_change
+                AFTER INSERT OR UPDATE OF first_name, last_name OR DELETE ON patients
+                FOR EACH ROW EXECUTE FUNCTION notify_patient_change()
+            """
+        ]),
+        # Double Metaphone keys (primary and alternate) for typo-tolerant
+        # name search; trigram similarity ranks the candidates they find
+        (8, "patient phonetic name keys", [
+            "CREATE EXTENSION IF NOT EXISTS fuzzystrmatch",
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS last_name_dmeta TEXT
+                GENERATED ALWAYS AS (dmetaphone(last_name)) STORED
+            """,
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS last_name_dmeta_alt TEXT
+                GENERATED ALWAYS AS (dmetaphone_alt(last_name)) STORED
+            """,
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS first_name_dmeta TEXT
+                GENERATED ALWAYS AS (dmetaphone(first_name)) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_patients_last_name_dmeta ON patients (last_name_dmeta)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_last_name_dmeta_alt ON patients (last_name_dmeta_alt)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_first_name_dmeta ON patients (first_name_dmeta)"
+        ]),
+        # Blocking keys and review queue for duplicate patient detection
+        # (mpi.py, find_duplicates.py): DOB + phonetic last name, email, phone
+        (9, "duplicate patient detection", [
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS email_normalized TEXT
+                GENERATED ALWAYS AS (NULLIF(lower(btrim(email)), '')) STORED
+            """,
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS phone_digits TEXT
+                GENERATED ALWAYS AS (NULLIF(right(regexp_replace(contact_number, '[^0-9]', '', 'g'), 10), '')) STORED
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_dob_last_name_dmeta
+                ON patients (date_of_birth, last_name_dmeta)
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_patients_email_normalized ON patients (email_normalized)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_phone_digits ON patients (phone_digits)",
+            """
+            CREATE TABLE IF NOT EXISTS patient_duplicate_candidates (
+                patient_id INTEGER NOT NULL REFERENCES patients(patient_id) ON DELETE CASCADE,
+                duplicate_of INTEGER NOT NULL REFERENCES patients(patient_id) ON DELETE CASCADE,
+                score NUMERIC(4, 3) NOT NULL,
+                reasons TEXT[] NOT NULL DEFAULT '{}',
+                status VARCHAR(20) NOT NULL DEFAULT 'open',
+                detected_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (patient_id, duplicate_of),
+                CHECK (patient_id > duplicate_of)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patient_duplicate_candidates_open
+                ON patient_duplicate_candidates (score DESC) WHERE status = 'open'
+            """
+        ]),
+        # Cohort filters (/api/patients/cohort): the comma-joined allergies
+        # and medical_conditions text split into lower-case arrays with GIN
+        # indexes, and single-column B-tree indexes the planner can combine
+        # with them in a BitmapAnd. "None" and "NKDA" mean an empty list.
+        (10, "patient cohort filter indexes", [
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS allergy_list TEXT[]
+                GENERATED ALWAYS AS (
+                    CASE WHEN lower(btrim(COALESCE(allergies, ''))) IN ('', 'none', 'nkda', 'n/a')
+                         THEN '{}'::text[]
+                         ELSE array_remove(regexp_split_to_array(lower(btrim(allergies)), '\\s*,\\s*'), '')
+                    END
+                ) STORED
+            """,
+            """
+            ALTER TABLE patients
+                ADD COLUMN IF NOT EXISTS condition_list TEXT[]
+                GENERATED ALWAYS AS (
+                    CASE WHEN lower(btrim(COALESCE(medical_conditions, ''))) IN ('', 'none', 'n/a')
+                         THEN '{}'::text[]
+                         ELSE array_remove(regexp_split_to_array(lower(btrim(medical_conditions)), '\\s*,\\s*'), '')
+                    END
+                ) STORED
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_patients_allergy_list ON patients USING gin (allergy_list)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_condition_list ON patients USING gin (condition_list)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_service ON patients (service)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_rank ON patients (rank)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_blood_type ON patients (blood_type)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_gender ON patients (gender)",
+            # Fresh statistics on the new columns for the planner's selectivity estimates
+            "ANALYZE patients"
+        ]),
+        # Patient counts per facet value for the unfiltered patient list,
+        # kept current by a trigger on patients the way
+        # appointment_daily_counts is. NULL values are stored as ''.
+        (11, "patient facet counts", [
+            """
+            CREATE TABLE IF NOT EXISTS patient_facet_counts (
+                facet VARCHAR(20) NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (facet, value)
+            )
+            """,
+            # The (facet, value) pairs one patient contributes to. Conditions
+            # are distinct: one upsert may not touch the same row twice.
+            """
+            CREATE OR REPLACE FUNCTION patient_facet_values(
+                p_blood_type TEXT, p_service TEXT, p_rank TEXT, p_gender TEXT, p_conditions TEXT[]
+            ) RETURNS TABLE (facet TEXT, value TEXT) AS $$
+                VALUES ('total', ''),
+                       ('blood_type', COALESCE(p_blood_type, '')),
+                       ('service', COALESCE(p_service, '')),
+                       ('rank', COALESCE(p_rank, '')),
+                       ('gender', COALESCE(p_gender, ''))
+                UNION ALL
+                SELECT DISTINCT 'condition', c FROM unnest(p_conditions) AS c
+            $$ LANGUAGE sql IMMUTABLE
+            """,
+            """
+            CREATE OR REPLACE FUNCTION bump_patient_facet_counts(
+                p_blood_type TEXT, p_service TEXT, p_rank TEXT, p_gender TEXT,
+                p_conditions TEXT[], p_delta INTEGER
+            ) RETURNS VOID AS $$
+            BEGIN
+                INSERT INTO patient_facet_counts (facet, value, count)
+                SELECT f.facet, f.value, p_delta
+                FROM patient_facet_values(p_blood_type, p_service, p_rank, p_gender, p_conditions) f
+                ON CONFLICT (facet, value)
+                DO UPDATE SET count = patient_facet_counts.count + EXCLUDED.count;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE FUNCTION maintain_patient_facet_counts()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE'
+                   AND OLD.blood_type IS NOT DISTINCT FROM NEW.blood_type
+                   AND OLD.service IS NOT DISTINCT FROM NEW.service
+                   AND OLD.rank IS NOT DISTINCT FROM NEW.rank
+                   AND OLD.gender IS NOT DISTINCT FROM NEW.gender
+                   AND OLD.condition_list IS NOT DISTINCT FROM NEW.condition_list THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    PERFORM bump_patient_facet_counts(
+                        OLD.blood_type, OLD.service, OLD.rank, OLD.gender, OLD.condition_list, -1);
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM bump_patient_facet_counts(
+                        NEW.blood_type, NEW.service, NEW.rank, NEW.gender, NEW.condition_list, 1);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS patients_facet_counts ON patients",
+            """
+            CREATE TRIGGER patients_facet_counts
+                AFTER INSERT OR UPDATE OR DELETE ON patients
+                FOR EACH ROW EXECUTE FUNCTION maintain_patient_facet_counts()
+            """,
+            # One-off backfill for databases that already hold patients
+            """
+            INSERT INTO patient_facet_counts (facet, value, count)
+            SELECT f.facet, f.value, COUNT(*)
+            FROM patients p
+            CROSS JOIN LATERAL patient_facet_values(
+                p.blood_type, p.service, p.rank, p.gender, p.condition_list) f
+            WHERE NOT EXISTS (SELECT 1 FROM patient_facet_counts)
+            GROUP BY 1, 2
+            """
+        ])
+    ]
+
+def applied_migrations(cur):
+    """Return the set of migration versions already applied."""
+    cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            full_name VARCHAR(100) NOT NULL,
-            hashed_password VARCHAR(255) NOT NULL,
-            role VARCHAR(20) NOT NULL DEFAULT 'user',
-            is_active BOOLEAN NOT NULL DEFAULT TRUE,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
         )
-        """,
         """
-        CREATE TABLE IF NOT EXISTS login_history (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            timestamp TIMESTAMP NOT NULL,
-            "ipAddress" VARCHAR(45) NOT NULL,
-            success BOOLEAN NOT NULL,
-            user_agent VARCHAR(255)
-        )
-        """,
+    )
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+def run_migrations(conn, partitioned=False, target=None):
+    """Apply pending migrations in order, each in its own transaction
+
+    Stops at the first failing migration so later ones never run against a
+    half-migrated schema. Returns True when everything up to ``target`` (or
+    the latest version) is applied.
+    """
+    cur = conn.cursor()
+    applied = applied_migrations(cur)
+    conn.commit()
+
+    for version, name, statements in build_migrations(partitioned):
+        if target is not None and version > target:
+            break
+        if version in applied:
+            continue
+        print(f"Applying migration {version}: {name}")
+        try:
+            for statement in statements:
+                print(f"Executing: {' '.join(statement.split())[:60]}...")
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            conn.commit()
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(f"Error applying migration {version}: {error}")
+            conn.rollback()
+            cur.close()
+            return False
+
+    # Lay down partitions around the current month
+    if partitioned:
+        try:
+            for table in PARTITIONED_TABLES:
+                if is_partitioned(cur, table):
+                    create_partitions(cur, table, months_back=3, months_ahead=3)
+                else:
+                    print(f"{table} already exists unpartitioned; leaving it as is")
+            conn.commit()
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(f"Error creating partitions: {error}")
+            conn.rollback()
+            cur.close()
+            return False
+
+    cur.close()
+    print("Migrations applied successfully!")
+    return True
+
+def print_migration_status(conn):
+    """Print which migrations are applied and which are pending."""
+    cur = conn.cursor()
+    applied = applied_migrations(cur)
+    conn.commit()
+    cur.close()
+    for version, name, _ in build_migrations():
+        state = "applied" if version in applied else "pending"
+        print(f"{version:>3}  {state:<8} {name}")
+
+# Hot query shapes served by the APIs. Each lists the table, the leading
+# index columns (or the index method for GIN searches) that serve it, and
+# the index the advisor suggests when none does.
+QUERY_SHAPES = [
+    {
+        'query': 'get_patients: ORDER BY last_name, first_name',
+        'table': 'patients', 'columns': ['last_name', 'first_name'],
+        'suggest': 'CREATE INDEX idx_patients_name ON patients (last_name, first_name)'
+    },
+    {
+        'query': 'get_patients: last_name ILIKE %term%',
+        'table': 'patients', 'columns': ['last_name'], 'method': 'gin',
+        'suggest': 'CREATE INDEX idx_patients_last_name_trgm ON patients USING gin (last_name gin_trgm_ops)'
+    },
+    {
+        'query': 'get_patients fuzzy: last_name_dmeta = dmetaphone(term)',
+        'table': 'patients', 'columns': ['last_name_dmeta'],
+        'suggest': 'CREATE INDEX idx_patients_last_name_dmeta ON patients (last_name_dmeta)'
+    },
+    {
+        'query': 'cohort: condition_list @> conditions',
+        'table': 'patients', 'columns': ['condition_list'], 'method': 'gin',
+        'suggest': 'CREATE INDEX idx_patients_condition_list ON patients USING gin (condition_list)'
+    },
+    {
+        'query': 'cohort: allergy_list @> allergies',
+        'table': 'patients', 'columns': ['allergy_list'], 'method': 'gin',
+        'suggest': 'CREATE INDEX idx_patients_allergy_list ON patients USING gin (allergy_list)'
+    },
+    {
+        'query': 'cohort: service = ANY(services)',
+        'table': 'patients', 'columns': ['service'],
+        'suggest': 'CREATE INDEX idx_patients_service ON patients (service)'
+    },
+    {
+        'query': 'get_appointments: provider schedule by time',
+        'table': 'appointments', 'columns': ['provider_id', 'appointment_time'],
+        'suggest': 'CREATE INDEX idx_appointments_provider_time ON appointments (provider_id, appointment_time)'
+    },
+    {
+        'query': 'get_appointments: patient schedule by time',
+        'table': 'appointments', 'columns': ['patient_id', 'appointment_time'],
+        'suggest': 'CREATE INDEX idx_appointments_patient_time ON appointments (patient_id, appointment_time)'
+    },
+    {
+        'query': 'get_appointments: keyset pages by (appointment_time, id)',
+        'table': 'appointments', 'columns': ['appointment_time', 'id'],
+        'suggest': 'CREATE INDEX idx_appointments_time_id ON appointments (appointment_time DESC, id DESC)'
+    },
+    {
+        'query': 'get_patient_notes: notes by patient, newest first',
+        'table': 'patient_notes', 'columns': ['patient_id', 'created_at'],
+        'suggest': 'CREATE INDEX idx_patient_notes_patient_created ON patient_notes (patient_id, created_at DESC, id DESC)'
+    },
+    {
+        'query': 'get_patient_records: visits by patient',
+        'table': 'visits', 'columns': ['patient_id', 'visit_date'],
+        'suggest': 'CREATE INDEX idx_visits_patient_date ON visits (patient_id, visit_date DESC, id DESC)'
+    },
+    {
+        'query': 'get_patient_records: medications by patient',
+        'table': 'medications', 'columns': ['patient_id', 'start_date'],
+        'suggest': 'CREATE INDEX idx_medications_patient_start ON medications (patient_id, start_date DESC, id DESC)'
+    },
+    {
+        'query': 'login history by user',
+        'table': 'login_history', 'columns': ['user_id', 'timestamp'],
+        'suggest': 'CREATE INDEX idx_login_history_user_time ON login_history (user_id, timestamp DESC)'
+    }
+]
+
+# Tables smaller than this are cheaper to scan than to index
+ADVISOR_MIN_ROWS = 10000
+
+def table_indexes(cur, table):
+    """Return (index name, access method, ordered column names) for a table."""
+    cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS user_sessions (
-            id SERIAL PRIMARY KEY,
-            user_id INTEGER REFERENCES users(id),
-            session_token VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL,
-            is_active BOOLEAN NOT NULL DEFAULT TRUE
-        )
+        SELECT i.relname, am.amname,
+               array_agg(a.attname::text ORDER BY k.ord) AS columns
+        FROM pg_index x
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        CROSS JOIN LATERAL unnest(x.indkey) WITH ORDINALITY AS k(attnum, ord)
+        LEFT JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE t.oid = to_regclass(%s)
+        GROUP BY i.relname, am.amname
         """,
-        """
-        CREATE TABLE IF NOT EXISTS patients (
-            id SERIAL PRIMARY KEY,
-            medical_record_number VARCHAR(50) UNIQUE NOT NULL,
-            first_name VARCHAR(50) NOT NULL,
-            last_name VARCHAR(50) NOT NULL,
-            date_of_birth DATE NOT NULL,
-            gender VARCHAR(20),
-            address VARCHAR(255),
-            phone VARCHAR(20),
-            email VARCHAR(100),
-            insurance_provider VARCHAR(100),
-            insurance_id VARCHAR(50),
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        (table,)
+    )
+    return cur.fetchall()
+
+def shape_is_indexed(shape, indexes):
+    """Check whether any index serves a query shape by its leading columns."""
+    wanted = shape['columns']
+    method = shape.get('method', 'btree')
+    for _, index_method, columns in indexes:
+        if index_method == method and list(columns[:len(wanted)]) == wanted:
+            return True
+    return False
+
+def advise_indexes(conn):
+    """Compare scan statistics against the known query shapes
+
+    Reports tables whose sequential scans read a large share of their rows
+    and lists every hot query shape that has no supporting index, with the
+    CREATE INDEX statement to fix it. Returns the list of findings.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT relname, seq_scan, seq_tup_read, COALESCE(idx_scan, 0), n_live_tup
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'public'
+            """
         )
-        """,
+        stats = {row[0]: row[1:] for row in cur.fetchall()}
+
+        findings = []
+        for table in sorted({shape['table'] for shape in QUERY_SHAPES}):
+            if table not in stats:
+                continue
+            seq_scan, seq_tup_read, idx_scan, live_rows = stats[table]
+            indexes = table_indexes(cur, table)
+            missing = [s for s in QUERY_SHAPES if s['table'] == table and not shape_is_indexed(s, indexes)]
+            scan_heavy = live_rows >= ADVISOR_MIN_ROWS and seq_scan > idx_scan
+
+            print(f"{table}: {live_rows} rows, {seq_scan} seq scans "
+                  f"({seq_tup_read} rows read), {idx_scan} index scans")
+            if scan_heavy:
+                print("  sequential scans outnumber index scans on a large table")
+            for shape in missing:
+                print(f"  missing index for {shape['query']}")
+                print(f"    {shape['suggest']};")
+            findings.append({
+                'table': table,
+                'seq_scan': seq_scan,
+                'idx_scan': idx_scan,
+                'live_rows': live_rows,
+                'scan_heavy': scan_heavy,
+                'missing': [shape['suggest'] for shape in missing]
+            })
+        return findings
+    finally:
+        cur.close()
+
+def add_months(day, months):
+    """Return the first day of the month ``months`` away from ``day``."""
+    month_index = day.month - 1 + months
+    return date(day.year + month_index // 12, month_index % 12 + 1, 1)
+
+def is_partitioned(cur, table):
+    """Check whether ``table`` is a partitioned parent table."""
+    cur.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+        (table,)
+    )
+    return cur.fetchone() is not None
+
+def add_overlap_constraint(cur, partition):
+    """Add the provider overlap exclusion constraint to one appointments partition.
+
+    Exclusion constraints cannot span partitions, so each month enforces its
+    own; only bookings straddling midnight at a month boundary escape it.
+    """
+    cur.execute(
+        sql.SQL(
+            """
+            ALTER TABLE {} ADD CONSTRAINT {}
+                EXCLUDE USING gist (provider_id WITH =, time_range WITH &&)
+                WHERE (status <> 'Cancelled')
+            """
+        ).format(sql.Identifier(partition), sql.Identifier(f"{partition}_no_provider_overlap"))
+    )
+
+def stored_columns(cur, table):
+    """Return the non-generated columns of ``table`` in table order."""
+    cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS visits (
-            id SERIAL PRIMARY KEY,
-            patient_id INTEGER REFERENCES patients(id),
-            visit_date TIMESTAMP NOT NULL,
-            visit_type VARCHAR(50) NOT NULL,
-            provider_id INTEGER REFERENCES users(id),
-            reason_for_visit TEXT,
-            diagnosis TEXT,
-            notes TEXT,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-        )
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
         """,
-        """
-        CREATE TABLE IF NOT EXISTS medications (
-            id SERIAL PRIMARY KEY,
-            patient_id INTEGER REFERENCES patients(id),
-            medication_name VARCHAR(100) NOT NULL,
-            dosage VARCHAR(50) NOT NULL,
-            frequency VARCHAR(50) NOT NULL,
-            start_date DATE NOT NULL,
-            end_date DATE,
-            prescriber_id INTEGER REFERENCES users(id),
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        (table,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+def park_default_rows(cur, table, start, end):
+    """Move rows in [start, end) out of ``table``'s default partition.
+
+    A partition cannot be created while the default partition holds rows
+    in its range, and the whole maintenance run would fail on every retry.
+    The default partition is locked ACCESS EXCLUSIVE (creating the
+    partition takes that lock anyway) and scanned once for the range. Its
+    matching rows are moved to a temporary table. Reads and writes that touch
+    the default partition wait until the maintenance transaction commits,
+    which is quick while the default partition stays small. Returns the
+    temporary table name and columns, or None when nothing had to move.
+    """
+    default = f"{table}_default"
+    cur.execute("SELECT to_regclass(%s)", (default,))
+    if cur.fetchone()[0] is None:
+        return None
+
+    column = PARTITIONED_TABLES[table]['column']
+    cur.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE").format(sql.Identifier(default)))
+    cur.execute(
+        sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE {} >= %s AND {} < %s)").format(
+            sql.Identifier(default), sql.Identifier(column), sql.Identifier(column)
+        ),
+        (start, end)
+    )
+    if not cur.fetchone()[0]:
+        return None
+
+    parked = f"{default}_parked"
+    columns = sql.SQL(', ').join(sql.Identifier(c) for c in stored_columns(cur, table))
+    cur.execute(
+        sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(
+            sql.Identifier(parked), sql.Identifier(table)
         )
-        """
-        """
-        CREATE TABLE IF NOT EXISTS appointments (
-            id SERIAL PRIMARY KEY,
-            patient_id INTEGER REFERENCES patients(id),
-            provider_id INTEGER REFERENCES users(id),
-            appointment_time TIMESTAMP NOT NULL,
-            reason TEXT,
-            status VARCHAR(20) NOT NULL DEFAULT 'Scheduled',
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    cur.execute(
+        sql.SQL(
+            """
+            WITH moved AS (
+                DELETE FROM {default} WHERE {column} >= %s AND {column} < %s
+                RETURNING {columns}
+            )
+            INSERT INTO {parked} ({columns}) SELECT {columns} FROM moved
+            """
+        ).format(
+            default=sql.Identifier(default), column=sql.Identifier(column),
+            columns=columns, parked=sql.Identifier(parked)
+        ),
+        (start, end)
+    )
+    print(f"Moving {cur.rowcount} rows from {default} into the new partition")
+    return parked, columns
+
+def create_partition(cur, table, month):
+    """Create the monthly partition of ``table`` starting at ``month``."""
+    name = f"{table}_{month:%Y_%m}"
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    if cur.fetchone()[0] is not None:
+        return False
+
+    parked = park_default_rows(cur, table, month, add_months(month, 1))
+    cur.execute(
+        sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(name), sql.Identifier(table)
+        ),
+        (month, add_months(month, 1))
+    )
+    if table == 'appointments':
+        add_overlap_constraint(cur, name)
+    if parked:
+        parked_table, columns = parked
+        cur.execute(
+            sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+                sql.Identifier(table), columns, columns, sql.Identifier(parked_table)
+            )
         )
-        """
-        """
-        CREATE TABLE IF NOT EXISTS patient_notes (
-            id SERIAL PRIMARY KEY,
-            patient_id INTEGER REFERENCES patients(id),
-            note TEXT NOT NULL,
-            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(parked_table)))
+    print(f"Created partition {name}")
+    return True
+
+def create_partitions(cur, table, months_back=0, months_ahead=3):
+    """Ensure monthly partitions exist for a window around the current month.
+
+    A default partition catches rows outside the pre-created window so
+    inserts never fail for lack of a partition. When a later run creates
+    the partition for such rows, they are moved out of the default first
+    (see park_default_rows).
+    """
+    this_month = date.today().replace(day=1)
+    for offset in range(-months_back, months_ahead + 1):
+        create_partition(cur, table, add_months(this_month, offset))
+    default = f"{table}_default"
+    cur.execute("SELECT to_regclass(%s)", (default,))
+    if cur.fetchone()[0] is None:
+        cur.execute(
+            sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(
+                sql.Identifier(default), sql.Identifier(table)
+            )
         )
+        if table == 'appointments':
+            add_overlap_constraint(cur, default)
+
+def expire_partitions(cur, table, retention_months, drop=False):
+    """Detach (and optionally drop) partitions older than the retention window.
+
+    Detaching is a catalog change rather than a bulk DELETE, so expiring a
+    month costs the same regardless of its size and leaves no bloat behind.
+    Rollups such as appointment_daily_counts keep their historical counts.
+    """
+    if not retention_months:
+        return []
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    cur.execute(
         """
-    ]
-    
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        (table,)
+    )
+    pattern = re.compile(rf"^{table}_(\d{{4}})_(\d{{2}})$")
+    expired = []
+    for (name,) in cur.fetchall():
+        match = pattern.match(name)
+        if not match or date(int(match.group(1)), int(match.group(2)), 1) >= cutoff:
+            continue
+        cur.execute(
+            sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(table), sql.Identifier(name)
+            )
+        )
+        if drop:
+            cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+        print(f"{'Dropped' if drop else 'Detached'} partition {name}")
+        expired.append(name)
+    return expired
+
+def maintain_partitions(conn, months_ahead=3, drop=False):
+    """Pre-create upcoming partitions and expire old ones per retention policy"""
     try:
         cur = conn.cursor()
-        # Execute each command
-        for command in commands:
-            print(f"Executing: {command[:60]}...")
-            cur.execute(command)
-        
-        # Close the cursor
+        for table, policy in PARTITIONED_TABLES.items():
+            if not is_partitioned(cur, table):
+                print(f"{table} is not partitioned; skipping")
+                continue
+            create_partitions(cur, table, months_ahead=months_ahead)
+            expire_partitions(cur, table, policy['retention_months'], drop=drop)
         cur.close()
-        
-        # Commit the changes
         conn.commit()
-        
-        print("Tables created successfully!")
+        print("Partition maintenance completed successfully!")
     except (Exception, psycopg2.DatabaseError) as error:
-        print(f"Error creating tables: {error}")
+        print(f"Error maintaining partitions: {error}")
         conn.rollback()
 
 def hash_password(password):
@@ -210,14 +1060,14 @@ def insert_sample_data(conn):
         cur.execute(
             """
             INSERT INTO patients (medical_record_number, first_name, last_name, date_of_birth, gender,
-                                address, phone, email, insurance_provider, insurance_id)
+                                address, contact_number, email, blood_type, rank, service)
             VALUES
                 ('MRN12345', 'John', 'Doe', '1975-05-15', 'Male',
                  '123 Main St, Anytown, ST 12345', '555-123-4567', 'john.doe@example.com',
-                 'Blue Cross', 'BC123456789'),
+                 'O+', 'E-5', 'Army'),
                 ('MRN67890', 'Jane', 'Smith', '1980-08-20', 'Female',
                  '456 Oak Ave, Sometown, ST 67890', '555-987-6543', 'jane.smith@example.com',
-                 'Aetna', 'AE987654321')
+                 'A-', 'O-3', 'Navy')
             ON CONFLICT (medical_record_number) DO NOTHING
             """
         )
@@ -233,16 +1083,53 @@ def main():
     """Main function to set up the database"""
     print("EHR System Database Setup")
     print("=========================")
+
+    parser = argparse.ArgumentParser(description='Set up and migrate the EHR database')
+    parser.add_argument('--status', action='store_true',
+                        help='Show applied and pending migrations, then exit')
+    parser.add_argument('--target', type=int,
+                        help='Only apply migrations up to this version')
+    parser.add_argument('--advise', action='store_true',
+                        help='Compare table scan statistics against known query shapes, then exit')
+    parser.add_argument('--no-sample-data', action='store_true',
+                        help='Skip inserting the sample users and patients')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='Create login_history and appointments as monthly range-partitioned tables')
+    parser.add_argument('--maintain-partitions', action='store_true',
+                        help='Only pre-create future partitions and expire old ones, then exit')
+    parser.add_argument('--months-ahead', type=int, default=3,
+                        help='Number of future monthly partitions to keep ready')
+    parser.add_argument('--drop-expired', action='store_true',
+                        help='Drop expired partitions instead of only detaching them')
+    args = parser.parse_args()
     
     try:
         # Get database connection
         conn = get_db_connection()
+
+        if args.status:
+            print_migration_status(conn)
+            conn.close()
+            return
+
+        if args.advise:
+            advise_indexes(conn)
+            conn.close()
+            return
+
+        if args.maintain_partitions:
+            maintain_partitions(conn, months_ahead=args.months_ahead, drop=args.drop_expired)
+            conn.close()
+            return
         
-        # Create tables
-        create_tables(conn)
+        # Apply pending migrations
+        if not run_migrations(conn, partitioned=args.partitioned, target=args.target):
+            conn.close()
+            sys.exit(1)
         
         # Insert sample data
-        insert_sample_data(conn)
+        if not args.no_sample_data:
+            insert_sample_data(conn)
         
         # Close the connection
         conn.close()
@@ -0,0 +1,90 @@
+import os
+import threading
+import functools
+from flask import request, current_app, Response
+
+# How long a follower waits for the leader before computing the result itself
+COALESCE_WAIT_SECONDS = float(os.getenv('COALESCE_WAIT_SECONDS', '30'))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """Runs one computation per key at a time and shares it with concurrent callers.
+
+    Nothing is cached: once the in-flight call finishes, the next caller for
+    the same key starts a fresh one.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func, timeout=COALESCE_WAIT_SECONDS):
+        """Return (result, shared) where ``shared`` is True if another caller computed it."""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = _Call()
+                leader = True
+            else:
+                call.followers += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                return func(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+_flights = SingleFlight()
+
+def request_key():
+    """Identity of a read: method, path and the raw query parameters.
+
+    Values are used exactly as sent, since views may treat ``a`` and ``a ``
+    differently; only the order of differently named parameters is ignored
+    (the sort is stable, so repeated parameters keep their order).
+    """
+    params = tuple(sorted(request.args.items(multi=True), key=lambda item: item[0]))
+    return (request.method, request.path, params)
+
+def coalesce(view):
+    """Let concurrent identical GET requests share one execution of ``view``.
+
+    Only use it on views whose response depends on nothing but the path and
+    query string. Each caller gets its own copy of the response, so
+    per-request headers added later (request id, traceparent) stay correct.
+    Shared responses carry ``X-Coalesced: 1``.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        def compute():
+            response = current_app.make_response(view(*args, **kwargs))
+            return response.get_data(), response.status_code, list(response.headers.items())
+
+        (body, status, headers), shared = _flights.do(request_key(), compute)
+        response = Response(body, status=status, headers=headers)
+        if shared:
+            response.headers['X-Coalesced'] = '1'
+        return response
+    return wrapper
@@ -1,10 +1,15 @@
 import os
 import sys
+import queue
+import argparse
 import subprocess
 import time
 import threading
 import signal
 import webbrowser
+import logging
+import logging.handlers
+from collections import deque
 from colorama import init, Fore, Style
 
 # Initialize colorama for colored output
@@ -19,6 +24,17 @@ HTTP_PORT = 8080  # HTML/assets server
 # Track subprocess objects
 processes = []
 
+# Console prefix colors per service
+SERVICE_COLORS = {
+    'login_api': Fore.MAGENTA,
+    'patient_api': Fore.BLUE,
+    'appointments_api': Fore.GREEN,
+    'static_server': Fore.WHITE
+}
+
+# Shared log aggregator, created in main()
+aggregator = None
+
 def print_header(message):
     """Print a formatted header message."""
     print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
@@ -37,6 +53,158 @@ def print_info(message):
     """Print an info message."""
     print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
 
+class LogAggregator:
+    """Collects the output of every child process without ever blocking it.
+
+    One reader thread per child drains its merged stdout/stderr pipe as fast
+    as the child writes and only enqueues lines. A single writer thread
+    prefixes them, applies the per-service rate limit, and writes them to the
+    console and to ``<log_dir>/<service>.log``, rotating files when
+    ``max_bytes`` is set. If the queue fills up, lines are dropped and counted
+    rather than making the children wait.
+    """
+
+    def __init__(self, log_dir='logs', max_bytes=10 * 1024 * 1024, backups=5,
+                 rate_limit=200, console=True, max_queue=10000):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rate_limit = rate_limit
+        self.console = console
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.loggers = {}
+        self.buckets = {}
+        self.suppressed = {}
+        self.dropped = {}
+        self.recent = {}
+        self.readers = []
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def attach(self, service, process):
+        """Start draining ``process.stdout`` on a reader thread."""
+        self.recent[service] = deque(maxlen=20)
+        self.dropped[service] = 0
+        self.suppressed[service] = 0
+        self.buckets[service] = [float(self.rate_limit), time.monotonic()]
+        if self.log_dir:
+            logger = logging.getLogger(f"ehr.{service}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            path = os.path.join(self.log_dir, f"{service}.log")
+            if self.max_bytes > 0:
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8')
+            else:
+                handler = logging.FileHandler(path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            self.loggers[service] = logger
+        reader = threading.Thread(target=self.read_loop, args=(service, process.stdout), daemon=True)
+        reader.start()
+        self.readers.append(reader)
+
+    def read_loop(self, service, stream):
+        for line in iter(stream.readline, ''):
+            line = line.rstrip('\n')
+            self.recent[service].append(line)
+            try:
+                self.queue.put_nowait((service, line))
+            except queue.Full:
+                self.dropped[service] += 1
+        stream.close()
+
+    def allow(self, service):
+        """Token bucket: up to ``rate_limit`` lines per second per service."""
+        if self.rate_limit <= 0:
+            return True
+        bucket = self.buckets[service]
+        now = time.monotonic()
+        bucket[0] = min(float(self.rate_limit), bucket[0] + (now - bucket[1]) * self.rate_limit)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+    def emit(self, service, line):
+        if self.console:
+            color = SERVICE_COLORS.get(service, '')
+            print(f"{color}[{service}]{Style.RESET_ALL} {line}", flush=True)
+        logger = self.loggers.get(service)
+        if logger:
+            logger.info(line)
+
+    def report_losses(self):
+        for service in list(self.suppressed):
+            if self.suppressed[service]:
+                count, self.suppressed[service] = self.suppressed[service], 0
+                self.emit(service, f"... {count} lines suppressed by rate limit")
+            if self.dropped[service]:
+                count, self.dropped[service] = self.dropped[service], 0
+                self.emit(service, f"... {count} lines dropped (log queue full)")
+
+    def write_loop(self):
+        last_report = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                service, line = item
+                if self.allow(service):
+                    self.emit(service, line)
+                else:
+                    self.suppressed[service] += 1
+                self.queue.task_done()
+            if time.monotonic() - last_report >= 1:
+                self.report_losses()
+                last_report = time.monotonic()
+
+    def tail(self, service):
+        """Return the last lines a service printed, for startup failure messages."""
+        return list(self.recent.get(service, []))
+
+    def close(self, timeout=2):
+        """Wait for the readers to hit EOF and the queue to drain."""
+        for reader in self.readers:
+            reader.join(timeout)
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.report_losses()
+        for logger in self.loggers.values():
+            for handler in logger.handlers:
+                handler.close()
+
+def spawn(service, args):
+    """Launch a child with its output routed through the log aggregator."""
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        # Invalid bytes must not kill the reader; an undrained pipe stalls the child
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1,
+        env=env
+    )
+    processes.append(process)
+    aggregator.attach(service, process)
+    return process
+
+def report_startup_failure(service, label):
+    """Print the last output of a child that exited during startup."""
+    print_error(f"{label} failed to start:")
+    time.sleep(0.2)  # let the reader thread collect the final lines
+    for line in aggregator.tail(service):
+        print_error(f"Output: {line}")
+
 def start_api_server():
     """Start the Flask API server."""
     print_header("Starting Login API Server")
@@ -48,12 +216,7 @@ def start_api_server():
         python_exe = sys.executable
         
         # Start Flask API server
-        api_process = subprocess.Popen(
-            [python_exe, "login_api.py"],
-            text=True
-        )
-        
-        processes.append(api_process)
+        api_process = spawn("login_api", [python_exe, "login_api.py"])
         
         # Wait a bit to ensure server starts
         time.sleep(2)
@@ -63,12 +226,7 @@ def start_api_server():
             print_success(f"Login API server running at http://localhost:{API_PORT}")
             return True
         else:
-            stdout, stderr = api_process.communicate()
-            print_error(f"Login API server failed to start:")
-            if stdout:
-                print_error(f"Output: {stdout}")
-            if stderr:
-                print_error(f"Error: {stderr}")
+            report_startup_failure("login_api", "Login API server")
             return False
             
     except Exception as e:
@@ -86,12 +244,7 @@ def start_patient_api_server():
         python_exe = sys.executable
         
         # Start Flask API server
-        api_process = subprocess.Popen(
-            [python_exe, "patient_api.py"],
-            text=True
-        )
-        
-        processes.append(api_process)
+        api_process = spawn("patient_api", [python_exe, "patient_api.py"])
         
         # Wait a bit to ensure server starts
         time.sleep(2)
@@ -101,12 +254,7 @@ def start_patient_api_server():
             print_success(f"Patient API server running at http://localhost:{PATIENT_API_PORT}")
             return True
         else:
-            stdout, stderr = api_process.communicate()
-            print_error(f"Patient API server failed to start:")
-            if stdout:
-                print_error(f"Output: {stdout}")
-            if stderr:
-                print_error(f"Error: {stderr}")
+            report_startup_failure("patient_api", "Patient API server")
             return False
             
     except Exception as e:
@@ -122,14 +270,7 @@ def start_appointments_api_server():
 
         python_exe = sys.executable
 
-        api_process = subprocess.Popen(
-            [python_exe, "appointments_api.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        processes.append(api_process)
+        api_process = spawn("appointments_api", [python_exe, "appointments_api.py"])
 
         time.sleep(2)
 
@@ -137,12 +278,7 @@ def start_appointments_api_server():
             print_success(f"Appointments API server running at http://localhost:{APPOINTMENTS_API_PORT}")
             return True
         else:
-            stdout, stderr = api_process.communicate()
-            print_error("Appointments API server failed to start:")
-            if stdout:
-                print_error(f"Output: {stdout}")
-            if stderr:
-                print_error(f"Error: {stderr}")
+            report_startup_failure("appointments_api", "Appointments API server")
             return False
 
     except Exception as e:
@@ -159,13 +295,8 @@ def start_http_server():
         # Use Python executable from current environment
         python_exe = sys.executable
         
-        # Start Python's HTTP server
-        http_process = subprocess.Popen(
-            [python_exe, "-m", "http.server", str(HTTP_PORT)],
-            text=True
-        )
-        
-        processes.append(http_process)
+        # Start the static asset server (precompressed, cached, threaded)
+        http_process = spawn("static_server", [python_exe, "static_server.py", "--port", str(HTTP_PORT)])
         
         # Wait a bit to ensure server starts
         time.sleep(1)
@@ -175,12 +306,7 @@ def start_http_server():
             print_success(f"HTTP server running at http://localhost:{HTTP_PORT}")
             return True
         else:
-            stdout, stderr = http_process.communicate()
-            print_error(f"HTTP server failed to start:")
-            if stdout:
-                print_error(f"Output: {stdout}")
-            if stderr:
-                print_error(f"Error: {stderr}")
+            report_startup_failure("static_server", "HTTP server")
             return False
             
     except Exception as e:
@@ -209,6 +335,9 @@ def cleanup(signum=None, frame=None):
                     process.kill()
             except Exception as e:
                 print_error(f"Error terminating process: {e}")
+
+    if aggregator is not None:
+        aggregator.close()
     
     print_success("All servers stopped")
     
@@ -218,7 +347,30 @@ def cleanup(signum=None, frame=None):
 
 def main():
     """Start both servers and open the login page."""
+    global aggregator
+
+    parser = argparse.ArgumentParser(description='Start the EHR servers with aggregated logging')
+    parser.add_argument('--log-dir', default='logs', help='Directory for per-service log files')
+    parser.add_argument('--no-log-files', action='store_true', help='Only log to the console')
+    parser.add_argument('--log-max-bytes', type=int, default=10 * 1024 * 1024,
+                        help='Rotate a service log at this size (0 disables rotation)')
+    parser.add_argument('--log-backups', type=int, default=5, help='Rotated log files kept per service')
+    parser.add_argument('--rate-limit', type=int, default=200,
+                        help='Maximum log lines per second per service (0 for no limit)')
+    parser.add_argument('--quiet', action='store_true', help='Do not echo service output to the console')
+    args = parser.parse_args()
+
     print_header("EHR System Server Startup")
+
+    aggregator = LogAggregator(
+        log_dir=None if args.no_log_files else args.log_dir,
+        max_bytes=args.log_max_bytes,
+        backups=args.log_backups,
+        rate_limit=args.rate_limit,
+        console=not args.quiet
+    )
+    if not args.no_log_files:
+        print_info(f"Service logs are written to {args.log_dir}/")
     
     # Register signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, cleanup)
@@ -0,0 +1,305 @@
+import os
+import re
+import sys
+import gzip
+import hashlib
+import argparse
+import mimetypes
+import posixpath
+import threading
+import urllib.parse
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from colorama import init, Fore, Style
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Initialize colorama for colored output
+init()
+
+HTTP_PORT = 8080
+
+# Only these file types are served, so .env, .py and the like never leave the machine
+STATIC_EXTENSIONS = {
+    '.html', '.css', '.js', '.mjs', '.map', '.json', '.webmanifest', '.txt',
+    '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico',
+    '.woff', '.woff2', '.ttf'
+}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.mjs', '.map', '.json', '.webmanifest', '.txt', '.svg'}
+# Files smaller than this are sent as-is; compression would not pay for itself
+MIN_COMPRESS_BYTES = 1024
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.venv', 'venv', '.static_cache'}
+
+# Bundler output such as assets/index-BdX3k2aQ.js never changes under the
+# same name. Only files in an assets/ directory whose last name segment
+# looks like a hash (8+ characters with a digit or mixed case) qualify, so
+# plain names like bootstrap-datepicker.js keep revalidating.
+HASHED_NAME = re.compile(r'(?:^|/)assets/(?:.*/)?[^/]*[.-]([A-Za-z0-9_]{8,})\.[a-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+def print_header(message):
+    """Print a formatted header message."""
+    print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{message.center(70)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
+
+def print_success(message):
+    """Print a success message."""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print an error message."""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+
+def print_info(message):
+    """Print an info message."""
+    print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
+
+def is_hashed_name(path):
+    """Check whether ``path`` is content-hashed bundler output."""
+    match = HASHED_NAME.search(path.replace(os.sep, '/'))
+    if not match:
+        return False
+    segment = match.group(1)
+    return any(c.isdigit() for c in segment) or (segment.lower() != segment and segment.upper() != segment)
+
+class Asset:
+    """A servable file plus its precompressed variants."""
+
+    def __init__(self, path, stat, rel):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.cache_control = IMMUTABLE_CACHE if is_hashed_name(rel) else REVALIDATE_CACHE
+        # encoding -> path of the compressed file
+        self.variants = {}
+
+    def is_current(self, stat):
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+class AssetStore:
+    """Index of the static files under ``root`` with their compressed variants.
+
+    Compressed copies are taken from ``<file>.br``/``<file>.gz`` produced by a
+    build step when they are up to date, otherwise generated once into
+    ``cache_dir``. Files edited while the server runs are picked up on their
+    next request.
+    """
+
+    def __init__(self, root, cache_dir):
+        self.root = os.path.realpath(root)
+        self.cache_dir = os.path.realpath(cache_dir)
+        self.assets = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def warm(self):
+        """Index and precompress every static file; returns the number indexed."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            for filename in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                self.get(rel)
+        return len(self.assets)
+
+    def resolve(self, url_path):
+        """Map a URL path to a file relative to root, or None if it may not be served."""
+        path = posixpath.normpath(urllib.parse.unquote(url_path.split('?', 1)[0].split('#', 1)[0]))
+        parts = [part for part in path.split('/') if part]
+        if any(part.startswith('.') for part in parts):
+            return None
+        rel = '/'.join(parts)
+        full = os.path.realpath(os.path.join(self.root, rel))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(full):
+            rel = posixpath.join(rel, 'index.html') if rel else 'index.html'
+        return rel
+
+    def get(self, rel):
+        """Return the up-to-date Asset for ``rel``, building it if needed."""
+        if os.path.splitext(rel)[1].lower() not in STATIC_EXTENSIONS:
+            return None
+        full = os.path.join(self.root, rel)
+        try:
+            stat = os.stat(full)
+        except OSError:
+            return None
+        asset = self.assets.get(rel)
+        if asset is not None and asset.is_current(stat):
+            return asset
+        with self.lock:
+            asset = self.assets.get(rel)
+            if asset is None or not asset.is_current(stat):
+                if asset is not None:
+                    self.discard(asset)
+                asset = self.build(rel, full, stat)
+                self.assets[rel] = asset
+        return asset
+
+    def discard(self, asset):
+        """Delete the cached compressed copies of an outdated asset."""
+        for path in asset.variants.values():
+            if os.path.dirname(path) == self.cache_dir:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def build(self, rel, full, stat):
+        asset = Asset(full, stat, rel)
+        if os.path.splitext(rel)[1].lower() not in COMPRESSIBLE_EXTENSIONS or stat.st_size < MIN_COMPRESS_BYTES:
+            return asset
+        data = None
+        for encoding, suffix, compress in (('br', '.br', brotli and (lambda d: brotli.compress(d, quality=11))),
+                                           ('gzip', '.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))):
+            prebuilt = full + suffix
+            if os.path.exists(prebuilt) and os.stat(prebuilt).st_mtime_ns >= stat.st_mtime_ns:
+                asset.variants[encoding] = prebuilt
+                continue
+            if compress is None:
+                continue
+            key = hashlib.sha1(f"{rel}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+            cached = os.path.join(self.cache_dir, key + suffix)
+            if not os.path.exists(cached):
+                if data is None:
+                    with open(full, 'rb') as f:
+                        data = f.read()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                tmp = f"{cached}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp, cached)
+            asset.variants[encoding] = cached
+        return asset
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts (q=0 excluded)."""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if name and not re.search(r'q\s*=\s*0(\.0*)?\s*$', params):
+            accepted.add(name.strip().lower())
+    return accepted
+
+class StaticHandler(BaseHTTPRequestHandler):
+    """Serves files from the AssetStore with compression, caching headers and sendfile."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'EHRStatic/1.0'
+    store = None
+    quiet = False
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def serve(self, send_body):
+        rel = self.store.resolve(self.path)
+        asset = self.store.get(rel) if rel is not None else None
+        if asset is None:
+            self.send_error(404, 'File not found')
+            return
+
+        accepted = accepted_encodings(self.headers.get('Accept-Encoding'))
+        encoding = next((e for e in ('br', 'gzip') if e in asset.variants and e in accepted), None)
+        etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+
+        if self.not_modified(asset, etag):
+            self.send_response(304)
+            self.send_common_headers(asset, etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        path = asset.variants[encoding] if encoding else asset.path
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+        with f:
+            length = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_common_headers(asset, etag)
+            self.send_header('Content-Type', asset.content_type)
+            self.send_header('Content-Length', str(length))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.end_headers()
+            if send_body:
+                # Zero-copy from the page cache to the socket where the OS supports it
+                self.connection.sendfile(f)
+
+    def not_modified(self, asset, etag):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or etag in tags or asset.etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= asset.mtime_ns // 1_000_000_000
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_common_headers(self, asset, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', asset.last_modified)
+        self.send_header('Cache-Control', asset.cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+class StaticServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+def main():
+    """Precompress the frontend assets and serve them."""
+    parser = argparse.ArgumentParser(description='Static asset server for the EHR frontend')
+    parser.add_argument('--port', type=int, default=HTTP_PORT, help='Port to listen on')
+    parser.add_argument('--root', default='.', help='Directory to serve')
+    parser.add_argument('--cache-dir', default='.static_cache', help='Where compressed copies are kept')
+    parser.add_argument('--quiet', action='store_true', help='Do not log each request')
+    args = parser.parse_args()
+
+    print_header("EHR Static Asset Server")
+    store = AssetStore(args.root, args.cache_dir)
+    count = store.warm()
+    compressed = sum(1 for asset in store.assets.values() if asset.variants)
+    print_info(f"Indexed {count} files, {compressed} precompressed ({'brotli + gzip' if brotli else 'gzip; pip install brotli for br'})")
+
+    StaticHandler.store = store
+    StaticHandler.quiet = args.quiet
+    try:
+        server = StaticServer(('', args.port), StaticHandler)
+    except OSError as e:
+        print_error(f"Cannot listen on port {args.port}: {e}")
+        sys.exit(1)
+    print_success(f"Serving {store.root} at http://localhost:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
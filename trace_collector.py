@@ -0,0 +1,156 @@
+import json
+import argparse
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from colorama import init, Fore, Style
+
+# Initialize colorama for colored output
+init()
+
+# Span names grouped into the stages reported per trace
+STAGES = ['db.connect', 'db.query', 'serialize', 'handler']
+
+def print_header(message):
+    """Print a formatted header message."""
+    print(f"\n{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{message.center(70)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}{'=' * 70}{Style.RESET_ALL}\n")
+
+def print_success(message):
+    """Print a success message."""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print an error message."""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+
+def print_info(message):
+    """Print an info message."""
+    print(f"{Fore.YELLOW}ℹ {message}{Style.RESET_ALL}")
+
+def iter_spans(payload):
+    """Yield (service, span) pairs from an OTLP/JSON ExportTraceServiceRequest."""
+    for resource_spans in payload.get('resourceSpans', []):
+        service = 'unknown'
+        for attribute in resource_spans.get('resource', {}).get('attributes', []):
+            if attribute['key'] == 'service.name':
+                service = attribute['value'].get('stringValue', service)
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                yield service, span
+
+def span_ms(span):
+    return (int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6
+
+def stage_of(span):
+    name = span['name']
+    if name.startswith('serialize'):
+        return 'serialize'
+    return name if name in STAGES else None
+
+def summarize_trace(spans):
+    """Break one trace down into wall time and time per stage in milliseconds."""
+    roots = [span for _, span in spans if span.get('kind') == 2]
+    stages = dict.fromkeys(STAGES, 0.0)
+    for _, span in spans:
+        stage = stage_of(span)
+        if stage:
+            stages[stage] += span_ms(span)
+    # Whatever the instrumented stages don't cover is handler code
+    stages['handler'] = max(0.0, sum(span_ms(root) for root in roots) - stages['db.connect']
+                            - stages['db.query'] - stages['serialize'])
+    start = min(int(span['startTimeUnixNano']) for _, span in spans)
+    end = max(int(span['endTimeUnixNano']) for _, span in spans)
+    return {
+        'wall_ms': (end - start) / 1e6,
+        'requests': [f"{service} {span['name'].removeprefix('HTTP ')}" for service, span in spans if span in roots],
+        'queries': sum(1 for _, span in spans if span['name'] == 'db.query'),
+        'stages': stages
+    }
+
+def load_traces(path):
+    """Group the spans in an exported trace file by trace id."""
+    traces = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                for service, span in iter_spans(json.loads(line)):
+                    traces[span['traceId']].append((service, span))
+    return traces
+
+def report(path, top):
+    """Print the slowest traces with their per-stage breakdown."""
+    print_header("Trace Report")
+    traces = load_traces(path)
+    if not traces:
+        print_info(f"No spans in {path}")
+        return
+    summaries = sorted((summarize_trace(spans) | {'trace_id': trace_id} for trace_id, spans in traces.items()),
+                       key=lambda summary: summary['wall_ms'], reverse=True)
+    print_info(f"{len(summaries)} traces in {path}; slowest {min(top, len(summaries))}:\n")
+    print(f"{'trace':<34}{'wall ms':>9}" + ''.join(f"{stage:>12}" for stage in STAGES) + f"{'queries':>9}")
+    for summary in summaries[:top]:
+        slowest = max(summary['stages'], key=summary['stages'].get)
+        cells = ''
+        for stage in STAGES:
+            color = Fore.RED if stage == slowest else ''
+            cells += f"{color}{summary['stages'][stage]:>12.1f}{Style.RESET_ALL}"
+        print(f"{summary['trace_id']:<34}{summary['wall_ms']:>9.1f}{cells}{summary['queries']:>9}")
+        for request in summary['requests']:
+            print(f"  {Fore.YELLOW}{request}{Style.RESET_ALL}")
+
+def serve(port, output):
+    """Accept OTLP/JSON trace exports on /v1/traces and append them to ``output``."""
+    lock = Lock()
+
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error(400, 'Body must be OTLP/JSON')
+                return
+            with lock:
+                with open(output, 'a') as f:
+                    f.write(json.dumps(payload) + '\n')
+            for service, span in iter_spans(payload):
+                if span.get('kind') == 2:
+                    print(f"{span['traceId'][:8]} {service:<18}{span['name']:<45}{span_ms(span):>8.1f} ms")
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    print_header("Trace Collector")
+    print_success(f"Listening on http://localhost:{port}/v1/traces, writing to {output}")
+    ThreadingHTTPServer(('', port), CollectorHandler).serve_forever()
+
+def main():
+    """Run the stand-in OTLP collector or report on collected traces."""
+    parser = argparse.ArgumentParser(description='Stand-in OTLP/JSON trace collector and latency breakdown report')
+    parser.add_argument('--port', type=int, default=4318, help='Port to accept trace exports on')
+    parser.add_argument('--output', default='traces.jsonl', help='File to append received traces to')
+    parser.add_argument('--report', metavar='FILE', help='Print the slowest traces in FILE instead of collecting')
+    parser.add_argument('--top', type=int, default=20, help='Number of traces shown by --report')
+    args = parser.parse_args()
+
+    try:
+        if args.report:
+            report(args.report, args.top)
+        else:
+            serve(args.port, args.output)
+    except FileNotFoundError as e:
+        print_error(str(e))
+    except KeyboardInterrupt:
+        print_info("Collector stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import logging
+import time
+import queue
+import random
+import threading
+import functools
+import urllib.request
+import psycopg2.extensions
+from psycopg2 import sql
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger('tracing')
+
+# Longest SQL text kept on a span
+MAX_STATEMENT_LENGTH = 500
+
+# Literals in statements that arrive with their values already merged
+MERGED_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+class Span:
+    """One timed operation within a trace."""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None, kind=1):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': {'intValue': str(value)} if isinstance(value, int) else {'stringValue': str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 0}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+class SpanExporter:
+    """Ships finished traces from a background thread so requests never wait on I/O.
+
+    Each payload is an OTLP/JSON ExportTraceServiceRequest. In 'file' mode
+    they are appended one per line to the ``destination`` file; in 'otlp'
+    mode they are POSTed to the ``destination`` URL (an OpenTelemetry
+    collector or trace_collector.py).
+    """
+
+    def __init__(self, mode, destination, max_queue=10000):
+        self.mode = mode
+        self.destination = destination
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, service, spans):
+        try:
+            self.queue.put_nowait((service, spans))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_service = {}
+            for service, spans in batch:
+                by_service.setdefault(service, []).extend(span.to_otlp() for span in spans)
+            payload = json.dumps({'resourceSpans': [
+                {
+                    'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service}}]},
+                    'scopeSpans': [{'scope': {'name': 'ehr.tracing'}, 'spans': spans}]
+                }
+                for service, spans in by_service.items()
+            ]})
+            try:
+                if self.mode == 'otlp':
+                    req = urllib.request.Request(self.destination, data=payload.encode('utf-8'),
+                                                 headers={'Content-Type': 'application/json'})
+                    urllib.request.urlopen(req, timeout=5).close()
+                else:
+                    with open(self.destination, 'a') as f:
+                        f.write(payload + '\n')
+            except Exception as e:
+                logger.warning(f"Error exporting traces: {e}")
+
+def current_span():
+    """Return the innermost open span of the current request, if it is traced."""
+    if not has_request_context():
+        return None
+    stack = g.get('trace_stack')
+    return stack[-1] if stack else None
+
+class start_span:
+    """Context manager timing a child span of the current request.
+
+    Does nothing outside a traced request, so helpers can be wrapped
+    unconditionally.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        parent = current_span()
+        if parent is not None:
+            self.span = Span(self.name, parent.trace_id, parent.span_id, self.attributes)
+            g.trace_stack.append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            self.span.end()
+            if exc is not None:
+                self.span.error = str(exc)
+            g.trace_stack.pop()
+            g.trace_spans.append(self.span)
+        return False
+
+def traced(name):
+    """Decorator form of ``start_span`` for helpers such as get_db_connection."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TracingCursor(psycopg2.extensions.cursor):
+    """Cursor that records each statement as a ``db.query`` span.
+
+    Only the SQL text is recorded, never the parameters, so patient data
+    does not end up in trace files.
+    """
+
+    def execute(self, query, vars=None):
+        if current_span() is None:
+            return super().execute(query, vars)
+        statement = self.statement_text(query)
+        with start_span('db.query', **{'db.statement': ' '.join(statement.split())[:MAX_STATEMENT_LENGTH]}) as s:
+            result = super().execute(query, vars)
+            s.attributes['db.rows'] = self.rowcount
+            return result
+
+    def statement_text(self, query):
+        if isinstance(query, bytes):
+            # execute_values and friends pass the statement with the values
+            # merged in; mask them so no patient data is recorded
+            encoding = psycopg2.extensions.encodings.get(self.connection.encoding, 'utf-8')
+            return MERGED_LITERAL.sub('?', query.decode(encoding, 'replace'))
+        if isinstance(query, sql.Composable):
+            return query.as_string(self)
+        return str(query)
+
+class TracingJSONProvider(DefaultJSONProvider):
+    """JSON provider that times response serialization."""
+
+    def dumps(self, obj, **kwargs):
+        with start_span('serialize.json'):
+            return super().dumps(obj, **kwargs)
+
+def parse_traceparent(header):
+    """Return (trace_id, parent_span_id, sampled) from a W3C traceparent header."""
+    match = TRACEPARENT.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+def init_tracing(app, service):
+    """Register request tracing on a Flask app.
+
+    Each request continues the caller's ``traceparent`` (or starts a new trace),
+    records a root span for the handler plus the child spans opened with
+    ``start_span``/``traced``, and echoes its own ``traceparent`` in the response.
+    """
+    # Read here rather than at import so values the APIs load from .env are seen.
+    # Where finished spans go: '' (tracing off), 'file' or 'otlp'
+    export = os.getenv('TRACE_EXPORT', '')
+    if export not in ('file', 'otlp'):
+        return
+    if export == 'file':
+        destination = os.getenv('TRACE_FILE', 'traces.jsonl')
+    else:
+        destination = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+    # Fraction of new traces that are recorded; incoming traceparent flags win
+    sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '1'))
+
+    exporter = SpanExporter(export, destination)
+    app.json = TracingJSONProvider(app)
+
+    @app.before_request
+    def start_trace():
+        incoming = parse_traceparent(request.headers.get('traceparent'))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < sample_rate
+        root = Span(f"HTTP {request.method}", trace_id, parent_id, {
+            'http.method': request.method,
+            'http.target': request.path
+        }, kind=2)
+        g.trace_root = root
+        g.trace_sampled = sampled
+        if sampled:
+            g.trace_stack = [root]
+            g.trace_spans = []
+
+    @app.after_request
+    def add_traceparent(response):
+        root = g.get('trace_root')
+        if root is not None:
+            flags = '01' if g.trace_sampled else '00'
+            response.headers['traceparent'] = f"00-{root.trace_id}-{root.span_id}-{flags}"
+            root.attributes['http.status_code'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_trace(error):
+        root = g.pop('trace_root', None)
+        if root is None or not g.get('trace_sampled'):
+            return
+        if request.url_rule is not None:
+            root.name = f"HTTP {request.method} {request.url_rule.rule}"
+            root.attributes['http.route'] = request.url_rule.rule
+        if error is not None:
+            root.error = str(error)
+        root.end()
+        g.trace_stack = []
+        exporter.submit(service, [root] + g.pop('trace_spans', []))